@@ -0,0 +1,72 @@
+import datetime
+import json
+
+
+class CountingConnection:
+    """Обёртка сокета, считающая отправленные байты и статус текущего ответа.
+    Статус берётся из первой строки ответа "HTTP/1.1 200 OK"."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self.status = None
+        self.bytes_sent = 0
+
+    def reset(self):
+        self.status = None
+        self.bytes_sent = 0
+
+    def sendall(self, data):
+        if self.status is None and data[:5] == b"HTTP/":
+            try:
+                self.status = int(data[9:12])
+            except ValueError:
+                pass
+        self._conn.sendall(data)
+        self.bytes_sent += len(data)
+
+    def sendfile(self, file, offset=0, count=None):
+        sent = self._conn.sendfile(file, offset, count)
+        self.bytes_sent += sent
+        return sent
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class AccessLog:
+    """Одна запись на запрос: строка запроса, выбранные заголовки, размер тела,
+    статус, отправленные байты и длительность. Тело не пишется, кроме
+    необязательного начала длиной preview_bytes, пропущенного через redact."""
+
+    def __init__(self, headers=("Host", "User-Agent", "Referer", "Content-Type", "Range"),
+                 preview_bytes=0, redact=None):
+        self._headers = headers
+        self.preview_bytes = preview_bytes
+        self._redact = redact or (lambda text: text)
+
+    def record(self, addr, request, conn, duration):
+        # addr - (IP, порт) клиента: отдельной записи о подключении нет
+        record = {
+            "time": datetime.datetime.now().isoformat(timespec="milliseconds"),
+            "client": addr[0],
+            "port": addr[1],
+            "request": f"{request.method} {request.target} {request.protocol}",
+            "status": conn.status,
+            "body_bytes": request.body.length - request.body.remaining,
+            "sent_bytes": conn.bytes_sent,
+            "duration_ms": round(duration * 1000, 1),
+            "headers": {name: request.headers[name] for name in self._headers if name in request.headers}
+        }
+        preview = request.body.preview
+        if preview:
+            record["body_preview"] = self._redact(preview.decode("utf-8", errors="replace"))
+        return record
+
+    @staticmethod
+    def to_json(record):
+        return json.dumps(record, ensure_ascii=False)
+
+    @staticmethod
+    def to_text(record):
+        return (f'{record["client"]}:{record["port"]} "{record["request"]}" {record["status"] or "-"} '
+                f'{record["sent_bytes"]}B {record["duration_ms"]}ms')
@@ -0,0 +1,113 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from httpParser import RequestTooLarge
+
+
+class AsyncEngine:
+    """Движок на asyncio: пока клиент присылает заголовки или просто молчит,
+    соединение живёт в event loop'е и не занимает поток. Готовый запрос
+    передаётся в пул потоков вместе с уже прочитанными байтами.
+
+    handler(conn, addr, data, state) выполняется в пуле. Если он вернул None,
+    соединение закрыто; иначе это keep-alive соединение, которое снова ждёт
+    в loop'е, а возвращённое значение передаётся handler'у со следующим запросом.
+
+    Если в пуле уже workers + max_pending запросов, новый сразу получает 503
+    с Retry-After; слишком длинные заголовки - 431. Оба ответа шлёт сам loop."""
+
+    HEADER_TERMINATOR = b'\r\n\r\n'
+
+    def __init__(self, handler, workers=32, header_timeout=45, idle_timeout=15, max_header_size=64 * 1024,
+                 max_pending=256, retry_after=5, log=print):
+        self._handler = handler
+        self._workers = workers
+        self._header_timeout = header_timeout
+        self._idle_timeout = idle_timeout
+        self._max_header_size = max_header_size
+        self._max_pending = max_pending
+        self._retry_after = retry_after
+        self._log = log
+        # Запросы, отданные в пул: выполняются и ждут свободного потока
+        self._in_pool = 0
+        self._executor = None
+        self._tasks = set()
+
+    def serve(self, server_socket):
+        self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="async-worker")
+        try:
+            asyncio.run(self._serve(server_socket))
+        finally:
+            self._executor.shutdown(wait=False)
+
+    async def _serve(self, server_socket):
+        loop = asyncio.get_running_loop()
+        server_socket.setblocking(False)
+        while True:
+            conn, addr = await loop.sock_accept(server_socket)
+            task = asyncio.create_task(self._accept(conn, addr))
+            # Держим ссылку на задачу, иначе её может собрать GC
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _accept(self, conn, addr):
+        loop = asyncio.get_running_loop()
+        state = None
+        timeout = self._header_timeout
+        while True:
+            conn.setblocking(False)
+            try:
+                data = await asyncio.wait_for(self._read_head(loop, conn), timeout)
+            except RequestTooLarge:
+                await self._reject(loop, conn, 431, "Request Header Fields Too Large")
+                return
+            except (asyncio.TimeoutError, OSError):
+                data = None
+            if not data:
+                conn.close()
+                return
+            if self._in_pool >= self._workers + self._max_pending:
+                self._log(f"Queue is full, rejecting {addr[0]}:{addr[1]}")
+                await self._reject(loop, conn, 503, "Service Unavailable", "Server is busy, try again later",
+                                   {"Retry-After": self._retry_after})
+                return
+            conn.setblocking(True)
+            self._in_pool += 1
+            try:
+                state = await loop.run_in_executor(self._executor, self._handler, conn, addr, data, state)
+            except Exception as e:
+                print(f"Handler error: {e}")
+                conn.close()
+                return
+            finally:
+                self._in_pool -= 1
+            if state is None:
+                return
+            timeout = self._idle_timeout
+
+    async def _read_head(self, loop, conn):
+        data = bytearray()
+        while True:
+            chunk = await loop.sock_recv(conn, 4096)
+            if not chunk:
+                return None
+            start = max(0, len(data) - len(self.HEADER_TERMINATOR) + 1)
+            data += chunk
+            if data.find(self.HEADER_TERMINATOR, start) != -1:
+                return bytes(data)
+            if len(data) > self._max_header_size:
+                raise RequestTooLarge("Request headers too large")
+
+    async def _reject(self, loop, conn, status, reason, message=None, headers=None):
+        # Ответ без участия пула; клиент, который не читает, не задерживает loop дольше 5 с
+        body = (message or reason).encode()
+        head = f"HTTP/1.1 {status} {reason}\r\nContent-Type: text/plain\r\nContent-Length: {len(body)}\r\n"
+        for name, value in (headers or {}).items():
+            head += f"{name}: {value}\r\n"
+        head += "Connection: close\r\n\r\n"
+        try:
+            await asyncio.wait_for(loop.sock_sendall(conn, head.encode() + body), 5)
+        except (asyncio.TimeoutError, OSError):
+            pass
+        finally:
+            conn.close()
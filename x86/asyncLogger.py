@@ -0,0 +1,109 @@
+import atexit
+import datetime
+import os
+import queue
+import threading
+import time
+
+
+class AsyncLogger:
+    """Журнал в файл без файловых вызовов в потоках-обработчиках: log() только
+    кладёт строку в ограниченную очередь, один фоновый поток пишет строки
+    пачками в постоянно открытый файл и сбрасывает его не чаще раза в
+    flush_interval секунд. Файл меняется при смене даты и при превышении
+    max_bytes (старый получает суффикс .1, .2, ...). Если очередь заполнена,
+    при overflow="drop" строка отбрасывается (в журнал потом пишется их число),
+    при overflow="block" вызывающий поток ждёт места."""
+
+    def __init__(self, directory, name_format="%d.%m.%Y", max_queue=10000, flush_interval=1.0,
+                 max_bytes=50 * 1024 * 1024, overflow="drop"):
+        if overflow not in ("drop", "block"):
+            raise ValueError("overflow must be drop or block")
+        self._directory = directory
+        self._name_format = name_format
+        self._queue = queue.Queue(max_queue)
+        self._flush_interval = flush_interval
+        self._max_bytes = max_bytes
+        self._block = overflow == "block"
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._file = None
+        self._file_date = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="logger", daemon=True)
+        self._thread.start()
+        # Недописанные строки сбрасываются и при обычном завершении интерпретатора
+        atexit.register(self.close)
+
+    def log(self, line):
+        if self._closed:
+            return
+        if self._block:
+            self._queue.put(line)
+            return
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            with self._dropped_lock:
+                self._dropped += 1
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        # None - сигнал писателю: дописать очередь и закрыть файл
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                lines = [self._queue.get(timeout=self._flush_interval)]
+            except queue.Empty:
+                lines = []
+            # Забираем всё, что накопилось, одной пачкой
+            while lines and len(lines) < 1000:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in lines
+            lines = [line for line in lines if line is not None]
+            try:
+                self._write(lines)
+                if self._file and (stop or time.monotonic() - last_flush >= self._flush_interval):
+                    self._file.flush()
+                    last_flush = time.monotonic()
+            except OSError as e:
+                print(f"Log write failed: {e}")
+            if stop:
+                if self._file:
+                    self._file.close()
+                return
+
+    def _write(self, lines):
+        with self._dropped_lock:
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            lines.append(f"{dropped} log lines dropped: log queue is full")
+        if not lines:
+            return
+        self._rotate()
+        self._file.write("".join(f"{line}\n" for line in lines))
+
+    def _rotate(self):
+        today = datetime.date.today()
+        if self._file and self._file_date == today and self._file.tell() < self._max_bytes:
+            return
+        if self._file:
+            self._file.close()
+        path = os.path.join(self._directory, f"{today.strftime(self._name_format)}.txt")
+        if os.path.exists(path) and os.path.getsize(path) >= self._max_bytes:
+            # Заполненный файл уходит в первый свободный .N, текущим снова становится основной
+            index = 1
+            while os.path.exists(f"{path[:-4]}.{index}.txt"):
+                index += 1
+            os.replace(path, f"{path[:-4]}.{index}.txt")
+        self._file = open(path, "a")
+        self._file_date = today
@@ -0,0 +1,125 @@
+import gzip
+import mimetypes
+import os
+import sys
+import tempfile
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# В порядке предпочтения сервера при равных q
+ENCODINGS = [name for name, module in (("zstd", zstandard), ("br", brotli), ("gzip", gzip)) if module]
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def is_compressible(content_type):
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def is_compressible_file(path):
+    return is_compressible(mimetypes.guess_type(path)[0])
+
+
+def negotiate(accept_encoding):
+    """Выбирает кодировку по Accept-Encoding или None, если клиент хочет identity."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for name in ENCODINGS:
+        q = weights.get(name, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def compress(data, encoding):
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    if encoding == "br":
+        return brotli.compress(data, quality=5)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+class StreamCompressor:
+    """Потоковое сжатие ответа, отдаваемого частями: compress() возвращает
+    готовые байты (возможно пустые), finish() - хвост."""
+
+    def __init__(self, encoding):
+        if encoding == "gzip":
+            # wbits=31 - формат gzip, совместимый с gzip.compress
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+            self._compress, self._finish = compressor.compress, compressor.flush
+        elif encoding == "br":
+            compressor = brotli.Compressor(quality=5)
+            self._compress, self._finish = compressor.process, compressor.finish
+        elif encoding == "zstd":
+            compressor = zstandard.ZstdCompressor(level=3).compressobj()
+            self._compress, self._finish = compressor.compress, compressor.flush
+        else:
+            raise ValueError(f"Unsupported encoding: {encoding}")
+
+    def compress(self, data):
+        return self._compress(data)
+
+    def finish(self):
+        return self._finish()
+
+
+def gzip_sibling(path, stat):
+    """Путь к актуальному path.gz (не старше самого файла) или None."""
+    sibling = path + ".gz"
+    try:
+        if os.stat(sibling).st_mtime_ns >= stat.st_mtime_ns:
+            return sibling
+    except OSError:
+        pass
+    return None
+
+
+def write_gzip_sibling(path, data):
+    """Атомарно сохраняет уже сжатые данные рядом с файлом как path.gz."""
+    directory = os.path.dirname(path)
+    try:
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".gz-", suffix=".part")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path + ".gz")
+    except OSError:
+        # Каталог может быть только для чтения - тогда просто держим вариант в памяти
+        pass
+
+
+def precompress_directory(directory):
+    """Заранее создаёт .gz для всех сжимаемых файлов каталога (при сборке/деплое)."""
+    for entry in os.scandir(directory):
+        if entry.is_file() and is_compressible_file(entry.path) and not gzip_sibling(entry.path, entry.stat()):
+            with open(entry.path, 'rb') as f:
+                write_gzip_sibling(entry.path, compress(f.read(), "gzip"))
+            print(f"{entry.path}.gz")
+
+
+if __name__ == "__main__":
+    precompress_directory(sys.argv[1] if len(sys.argv) > 1 else "resources/public")
@@ -0,0 +1,301 @@
+class BadRequest(ValueError):
+    pass
+
+
+class RequestTooLarge(ValueError):
+    pass
+
+
+class HttpHeaders:
+    """Заголовки запроса без учёта регистра имён."""
+
+    def __init__(self):
+        self._items = {}
+
+    def add(self, name, value):
+        key = name.lower()
+        if key in self._items:
+            # Повторные заголовки склеиваем через запятую, как в RFC 9110
+            value = f"{self._items[key][1]}, {value}"
+        self._items[key] = (name, value)
+
+    def get(self, name, default=None):
+        item = self._items.get(name.lower())
+        return item[1] if item else default
+
+    def __getitem__(self, name):
+        return self._items[name.lower()][1]
+
+    def __contains__(self, name):
+        return name.lower() in self._items
+
+    def items(self):
+        return list(self._items.values())
+
+
+class BodyStream:
+    """Тело запроса, читаемое по частям ровно до Content-Length.
+    Байты, уже попавшие в буфер соединения, отдаются первыми; из сокета
+    никогда не читается больше, чем осталось тела."""
+
+    def __init__(self, conn, buffer, length):
+        self._conn = conn
+        self._buffer = buffer
+        self.length = length
+        self.remaining = length
+        # Начало тела для журнала, только если включено через capture()
+        self.preview = None
+        self._preview_limit = 0
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        if self._buffer:
+            chunk = bytes(self._buffer[:size])
+            del self._buffer[:len(chunk)]
+        else:
+            chunk = self._conn.recv(min(size, 1024 * 1024))
+            if not chunk:
+                raise BadRequest("Connection closed before the request body was complete")
+        self.remaining -= len(chunk)
+        if self.preview is not None and len(self.preview) < self._preview_limit:
+            self.preview += chunk[:self._preview_limit - len(self.preview)]
+        return chunk
+
+    def capture(self, limit):
+        """Запоминать первые limit байт тела по мере чтения (копия не больше limit)."""
+        self.preview = bytearray()
+        self._preview_limit = limit
+
+    def read_all(self, limit):
+        if self.remaining > limit:
+            raise RequestTooLarge("Request body too large")
+        parts = []
+        while self.remaining:
+            parts.append(self.read())
+        return b''.join(parts)
+
+    def drain(self):
+        while self.remaining:
+            self.read(65536)
+
+
+class HttpRequest:
+    def __init__(self, method, target, protocol, headers, head, body):
+        self.method = method
+        self.target = target
+        self.protocol = protocol
+        self.headers = headers
+        # Блок заголовков как текст
+        self.head = head
+        self.body = body
+
+    @property
+    def content_length(self):
+        return self.body.length
+
+
+class RequestReader:
+    """Инкрементальный разбор запросов одного соединения. Буфер общий для всех
+    запросов, поэтому байты следующего (конвейерного) запроса не теряются."""
+
+    TERMINATOR = b'\r\n\r\n'
+
+    def __init__(self, conn, pending=b'', max_header_size=64 * 1024, max_body_size=None):
+        self._conn = conn
+        self._buffer = bytearray(pending)
+        self._max_header_size = max_header_size
+        self._max_body_size = max_body_size
+
+    def has_buffered(self):
+        return bool(self._buffer)
+
+    def receive(self):
+        chunk = self._conn.recv(4096)
+        if not chunk:
+            return False
+        self._buffer += chunk
+        return True
+
+    def read_request(self):
+        # Ищем конец заголовков только в новых байтах, а не во всём буфере
+        header_end = self._buffer.find(self.TERMINATOR)
+        while header_end == -1:
+            if len(self._buffer) > self._max_header_size:
+                raise RequestTooLarge("Request headers too large")
+            start = max(0, len(self._buffer) - len(self.TERMINATOR) + 1)
+            if not self.receive():
+                return None
+            header_end = self._buffer.find(self.TERMINATOR, start)
+
+        head = bytes(self._buffer[:header_end]).decode('utf-8', errors='replace')
+        del self._buffer[:header_end + len(self.TERMINATOR)]
+
+        lines = head.split('\r\n')
+        request_line = lines[0].split()
+        if len(request_line) != 3:
+            raise BadRequest(f"Malformed request line: {lines[0][:100]}")
+        method, target, protocol = request_line
+
+        headers = HttpHeaders()
+        for line in lines[1:]:
+            name, sep, value = line.partition(':')
+            if not sep:
+                raise BadRequest(f"Malformed header: {line[:100]}")
+            headers.add(name.strip(), value.strip())
+
+        if 'Transfer-Encoding' in headers:
+            raise BadRequest("Chunked request bodies are not supported")
+        try:
+            content_length = int(headers.get('Content-Length', 0))
+        except ValueError:
+            raise BadRequest("Invalid Content-Length")
+        if content_length < 0:
+            raise BadRequest("Invalid Content-Length")
+        if self._max_body_size is not None and content_length > self._max_body_size:
+            raise RequestTooLarge("Request body too large")
+
+        body = BodyStream(self._conn, self._buffer, content_length)
+        return HttpRequest(method.upper(), target, protocol.upper(), headers, head, body)
+
+
+def header_params(value):
+    """Разбирает 'form-data; name="file"; filename="a.txt"' в ('form-data', {...})."""
+    main, *params = value.split(';')
+    result = {}
+    for param in params:
+        key, sep, val = param.strip().partition('=')
+        if sep:
+            result[key.lower()] = val.strip().strip('"')
+    return main.strip().lower(), result
+
+
+class MultipartPart:
+    def __init__(self, reader, headers):
+        self._reader = reader
+        self.headers = headers
+        _, params = header_params(headers.get('Content-Disposition', ''))
+        self.name = params.get('name')
+        self.filename = params.get('filename')
+        self._chunks = reader._read_part()
+
+    def chunks(self):
+        return self._chunks
+
+    def read_all(self, limit):
+        data = bytearray()
+        for chunk in self._chunks:
+            data += chunk
+            if len(data) > limit:
+                raise RequestTooLarge("Multipart field too large")
+        return bytes(data)
+
+    def drain(self):
+        for _ in self._chunks:
+            pass
+
+
+class MultipartReader:
+    """Потоковый разбор multipart/form-data поверх BodyStream: граница ищется
+    в буфере фиксированного размера, поэтому память не зависит от размера файла.
+    Каждую часть нужно дочитать (или пропустить) до перехода к следующей."""
+
+    MAX_PART_HEADER_SIZE = 16 * 1024
+
+    def __init__(self, body, boundary, chunk_size=64 * 1024):
+        self._body = body
+        self._delimiter = b'\r\n--' + boundary.encode('latin-1')
+        # Первая граница идёт без CRLF перед ней - добавляем его, чтобы искать одинаково
+        self._buffer = bytearray(b'\r\n')
+        self._chunk_size = chunk_size
+
+    def parts(self):
+        self._skip_preamble()
+        while True:
+            while len(self._buffer) < 2:
+                self._fill()
+            if self._buffer[:2] == b'--':
+                # Закрывающая граница, остальное - эпилог
+                self._body.drain()
+                return
+            part = MultipartPart(self, self._read_part_headers())
+            yield part
+            part.drain()
+
+    def _fill(self):
+        chunk = self._body.read(self._chunk_size)
+        if not chunk:
+            raise BadRequest("Unexpected end of multipart body")
+        self._buffer += chunk
+
+    def _skip_preamble(self):
+        keep = len(self._delimiter) - 1
+        while (index := self._buffer.find(self._delimiter)) == -1:
+            if len(self._buffer) > keep:
+                del self._buffer[:-keep]
+            self._fill()
+        del self._buffer[:index + len(self._delimiter)]
+
+    def _read_part_headers(self):
+        while (index := self._buffer.find(b'\r\n\r\n')) == -1:
+            if len(self._buffer) > self.MAX_PART_HEADER_SIZE:
+                raise RequestTooLarge("Multipart headers too large")
+            self._fill()
+        head = bytes(self._buffer[:index]).decode('utf-8', errors='replace')
+        del self._buffer[:index + 4]
+        headers = HttpHeaders()
+        # Первая строка - остаток строки границы (обычно пустой)
+        for line in head.split('\r\n')[1:]:
+            name, sep, value = line.partition(':')
+            if sep:
+                headers.add(name.strip(), value.strip())
+        return headers
+
+    def _read_part(self):
+        keep = len(self._delimiter) - 1
+        while True:
+            index = self._buffer.find(self._delimiter)
+            if index != -1:
+                if index:
+                    yield bytes(self._buffer[:index])
+                del self._buffer[:index + len(self._delimiter)]
+                return
+            # Хвост может оказаться началом границы, его оставляем в буфере
+            safe = len(self._buffer) - keep
+            if safe > 0:
+                yield bytes(self._buffer[:safe])
+                del self._buffer[:safe]
+            self._fill()
+
+
+def parse_range(value, size, max_ranges=16):
+    """Разбирает заголовок Range для ресурса размера size.
+    Возвращает список (start, end) с включительным end, [] если ни один
+    диапазон не выполним (416), или None если заголовок надо игнорировать."""
+    unit, sep, specs = value.partition('=')
+    if not sep or unit.strip().lower() != 'bytes':
+        return None
+    ranges = []
+    for spec in specs.split(','):
+        first, dash, last = spec.strip().partition('-')
+        if not dash:
+            return None
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else size - 1
+                if last and start > end:
+                    return None
+            else:
+                suffix = int(last)
+                start = max(0, size - suffix)
+                end = size - 1 if suffix else -1
+        except ValueError:
+            return None
+        if start < size and start <= end:
+            ranges.append((start, min(end, size - 1)))
+    if len(ranges) > max_ranges:
+        return None
+    return ranges
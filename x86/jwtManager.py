@@ -1,21 +1,52 @@
 import json
 import jwt
 import datetime
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
 
 class JWTManager:
-    def __init__(self, secret_key, algorithm='HS256'):
+    def __init__(self, secret_key, algorithm='HS256', cache_size=4096, access_minutes=30, refresh_days=30):
         self.secret_key = secret_key
         self.algorithm = algorithm
+        self.access_minutes = access_minutes
+        self.refresh_days = refresh_days
+        # Кеш проверенных токенов: sha256(token) -> (user_id, exp). Запись живёт
+        # до exp самого токена, при переполнении вытесняется самая старая (LRU)
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_lock = threading.Lock()
 
     def encode(self, user_id):
-        expires_minutes = 30
         payload = {
             'user_id': user_id,
-            'exp': datetime.datetime.now() + datetime.timedelta(minutes=expires_minutes)
+            # exp в UTC: наивное локальное время PyJWT принял бы за UTC
+            'exp': datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=self.access_minutes)
         }
         token = jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
         return token
 
+    def encode_refresh(self, user_id):
+        """Долгоживущий refresh-токен. Возвращает (token, jti, exp): jti и exp
+        сохраняются в базе, чтобы токен можно было отозвать."""
+        jti = secrets.token_urlsafe(16)
+        exp = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=self.refresh_days)
+        payload = {'user_id': user_id, 'typ': 'refresh', 'jti': jti, 'exp': exp}
+        token = jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
+        return token, jti, int(exp.timestamp())
+
+    def decode_refresh(self, token):
+        """payload refresh-токена или None. Проверяется только подпись и срок -
+        отзыв проверяет вызывающий по jti."""
+        if not isinstance(token, str):
+            return None
+        result = self.decode(token)
+        if isinstance(result, dict) and result.get('typ') == 'refresh' and 'jti' in result:
+            return result
+        return None
+
     def decode(self, token):
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
@@ -26,9 +57,32 @@ class JWTManager:
             return 'Invalid token'
 
     def validate_token(self, token):
-        if token == "null":
-            return False
+        if not isinstance(token, str) or not token or token == "null":
+            return False, 'Invalid token'
+        key = hashlib.sha256(token.encode()).digest()
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                if cached[1] > time.time():
+                    self._cache.move_to_end(key)
+                    return True, cached[0]
+                del self._cache[key]
         result = self.decode(token)
-        if isinstance(result, dict) and 'user_id' in result:
+        # refresh-токен вместо access не принимаем
+        if isinstance(result, dict) and 'user_id' in result and result.get('typ', 'access') == 'access':
+            if 'exp' in result:
+                self._remember(key, result['user_id'], result['exp'])
             return True, result['user_id']  # Возвращает True и user_id, если токен валиден
-        return False, result  # Возвращает False и сообщение об ошибке
\ No newline at end of file
+        return False, result  # Возвращает False и сообщение об ошибке
+
+    def user_id(self, token):
+        """user_id из валидного токена или None."""
+        valid, result = self.validate_token(token)
+        return result if valid else None
+
+    def _remember(self, key, user_id, exp):
+        with self._cache_lock:
+            self._cache[key] = (user_id, exp)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
\ No newline at end of file
@@ -0,0 +1,64 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import bcrypt
+
+
+class HasherBusy(Exception):
+    """Очередь bcrypt заполнена (вообще или для этого IP) - клиенту отвечаем 429."""
+
+
+def hash_password(password):
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+
+
+def check_password(password, hashed_password):
+    return bcrypt.checkpw(password.encode(), hashed_password)
+
+
+class PasswordHasher:
+    """bcrypt в отдельном пуле из workers процессов, чтобы вход и регистрация
+    не занимали процессор потоков, отдающих файлы. Одновременно принимается не
+    больше max_pending операций и не больше per_ip от одного адреса, остальные
+    сразу получают HasherBusy."""
+
+    def __init__(self, workers=2, max_pending=32, per_ip=4):
+        if multiprocessing.current_process().daemon:
+            # Воркеры Supervisor - демоны и не могут порождать процессы;
+            # bcrypt отпускает GIL, так что ограниченный пул потоков даёт то же
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        else:
+            # spawn, а не fork: форкать процесс с работающими потоками небезопасно
+            self._executor = ProcessPoolExecutor(max_workers=workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        self._max_pending = max_pending
+        self._per_ip = per_ip
+        self._pending = 0
+        self._per_ip_pending = {}
+        self._lock = threading.Lock()
+
+    def hash(self, password, ip=None):
+        return self._run(ip, hash_password, password)
+
+    def check(self, password, hashed_password, ip=None):
+        return self._run(ip, check_password, password, hashed_password)
+
+    def _run(self, ip, fn, *args):
+        with self._lock:
+            if self._pending >= self._max_pending or self._per_ip_pending.get(ip, 0) >= self._per_ip:
+                raise HasherBusy("Too many authentication requests, try again later")
+            self._pending += 1
+            self._per_ip_pending[ip] = self._per_ip_pending.get(ip, 0) + 1
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+                if self._per_ip_pending[ip] == 1:
+                    del self._per_ip_pending[ip]
+                else:
+                    self._per_ip_pending[ip] -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
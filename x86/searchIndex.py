@@ -0,0 +1,91 @@
+import bisect
+import fnmatch
+import heapq
+import re
+
+
+class SearchIndex:
+    """Поиск файлов res_directory по имени и пути. Держит отсортированные
+    массивы путей и имён в нижнем регистре: префикс ищется бинарным поиском,
+    подстрока и glob - одним проходом по массиву без обращения к диску.
+    Индекс строится при запуске, загрузки попадают в небольшие добавочные
+    массивы и вливаются в основные раз в MERGE_SIZE файлов, после
+    пересканирования StorageIndex массивы перестраиваются целиком."""
+
+    MODES = ("prefix", "substring", "glob")
+
+    # Размер добавочных массивов, после которого они вливаются в основные
+    MERGE_SIZE = 1024
+
+    def __init__(self, storage_index):
+        self._storage_index = storage_index
+        # (пути, имена, добавленные пути, добавленные имена): отсортированные пары
+        # (ключ в нижнем регистре, путь). Кортеж заменяется целиком, поэтому поиск
+        # читает его без блокировки
+        self._arrays = self._build()
+        storage_index.subscribe(self._on_change)
+
+    def _on_change(self, rel_path):
+        # Вызывается под блокировкой записи StorageIndex - писатели уже упорядочены
+        if rel_path is None:
+            self._arrays = self._build()
+            return
+        paths, names, added_paths, added_names = self._arrays
+        # Копируются только добавочные массивы, основные - раз в MERGE_SIZE загрузок
+        added_paths, added_names = list(added_paths), list(added_names)
+        bisect.insort(added_paths, (rel_path.lower(), rel_path))
+        bisect.insort(added_names, (self._name(rel_path).lower(), rel_path))
+        if len(added_paths) >= self.MERGE_SIZE:
+            self._arrays = (list(heapq.merge(paths, added_paths)), list(heapq.merge(names, added_names)), [], [])
+        else:
+            self._arrays = (paths, names, added_paths, added_names)
+
+    def _build(self):
+        paths = sorted((path.lower(), path) for path in self._storage_index.file_paths())
+        names = sorted((self._name(path).lower(), path) for _, path in paths)
+        return paths, names, [], []
+
+    def search(self, query, mode="substring"):
+        """Все совпадения, лучшие первыми: точное имя, начало имени, начало пути,
+        подстрока в имени, подстрока в пути; внутри группы - короткие пути раньше."""
+        if mode not in self.MODES:
+            raise ValueError(f"mode must be one of {', '.join(self.MODES)}")
+        query = query.lower()
+        paths, names, added_paths, added_names = self._arrays
+        if mode == "prefix":
+            matches = set()
+            for array in (paths, names, added_paths, added_names):
+                matches.update(self._prefixed(array, query))
+        elif mode == "substring":
+            matches = [path for array in (paths, added_paths) for key, path in array if query in key]
+        else:
+            # Шаблон без "/" сравнивается с именем файла, со "/" - с полным путём
+            pattern = re.compile(fnmatch.translate(query))
+            sources = (paths, added_paths) if "/" in query else (names, added_names)
+            matches = [path for array in sources for key, path in array if pattern.match(key)]
+        return sorted(matches, key=lambda path: (self._rank(path, query), len(path), path))
+
+    @staticmethod
+    def _prefixed(array, prefix):
+        start = bisect.bisect_left(array, (prefix,))
+        for index in range(start, len(array)):
+            key, path = array[index]
+            if not key.startswith(prefix):
+                break
+            yield path
+
+    def _rank(self, path, query):
+        name = self._name(path).lower()
+        if name == query:
+            return 0
+        if name.startswith(query):
+            return 1
+        if path.lower().startswith(query):
+            return 2
+        if query in name:
+            return 3
+        return 4
+
+    @staticmethod
+    def _name(path):
+        return path.rsplit("/", 1)[-1]
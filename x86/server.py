@@ -1,17 +1,37 @@
 import socket
 import json
 import os
+import queue
+import re
+import tempfile
 import threading
+import base64
 import datetime
+import time
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
 from json import JSONDecodeError
 from urllib.parse import unquote
 
 from serverDB import ServerDB
 from jwtManager import JWTManager
+from asyncEngine import AsyncEngine
+from workerPool import WorkerPool
+from asyncLogger import AsyncLogger
+from accessLog import AccessLog, CountingConnection
+from staticCache import StaticCache
+from storageIndex import StorageIndex
+from searchIndex import SearchIndex
+from passwordHasher import PasswordHasher, HasherBusy
+from contentEncoding import negotiate, compress, is_compressible, is_compressible_file, gzip_sibling, StreamCompressor
+from httpParser import RequestReader, MultipartReader, BadRequest, RequestTooLarge, header_params, parse_range
 
 
 class Server:
-    def __init__(self, config_file_path):
+    # Имя файла журнала за день
+    LOG_NAME_FORMAT = "%d.%m.%Y"
+
+    def __init__(self, config_file_path, log_queue=None):
         print("Initializing Server")
         print("Reading config file: ")
         self._config_file_path = config_file_path
@@ -31,6 +51,29 @@ class Server:
                 "database_directory": "data",
                 "max_size_gigabytes": 2,
                 "secret": "secret",
+                "engine": "threads",
+                "async_workers": 32,
+                "worker_threads": 64,
+                "max_pending": 256,
+                "keep_alive_timeout": 15,
+                "max_keep_alive_requests": 100,
+                "workers": 1,
+                "cache_control_html": "no-cache",
+                "cache_control_res": "private, no-cache",
+                "static_cache_mb": 16,
+                "compress_min_bytes": 1024,
+                "index_rescan_seconds": 5,
+                "auth_workers": 2,
+                "auth_max_pending": 32,
+                "auth_per_ip": 4,
+                "access_token_minutes": 30,
+                "refresh_token_days": 30,
+                "log_queue_size": 10000,
+                "log_flush_seconds": 1,
+                "log_max_mb": 50,
+                "log_overflow": "drop",
+                "access_log_headers": ["Host", "User-Agent", "Referer", "Content-Type", "Range"],
+                "access_log_body_preview": 0,
                 "version": "1.0"
             }
             print(f"create config.json as {(json.dumps(data, indent=4))}")
@@ -49,16 +92,92 @@ class Server:
         self._database_name = config_file['database_name']
         self._secrets_file = self._read_secret(config_file["secret_path"])
         self._secret = self._secrets_file['secret']
+        # Один JWTManager на сервер: его кеш проверенных токенов общий для всех запросов
+        self._jwt = JWTManager(self._secret,
+                               access_minutes=config_file.get('access_token_minutes', 30),
+                               refresh_days=config_file.get('refresh_token_days', 30))
         self.MAX_REQUEST_SIZE = 1024 * 1024 * 1024 * self._max_size_gigabytes
         self.MAX_FILE_SIZE = 1024 * 1024 * 1024 * self._max_size_gigabytes
+        # Тела команд (json, form) читаются в память целиком, поэтому лимит отдельный
+        self.MAX_COMMAND_SIZE = 1024 * 1024
+        # Буфер отдачи файлов там, где нет os.sendfile
+        self.SEND_BUFFER_SIZE = 1024 * 1024
+        # Cache-Control для страниц из html_directory и для файлов из res_directory
+        self._cache_control_html = config_file.get('cache_control_html', 'no-cache')
+        self._cache_control_res = config_file.get('cache_control_res', 'private, no-cache')
+        # "threads" - поток на соединение, "asyncio" - один event loop и пул обработчиков
+        self._engine = config_file.get('engine', 'threads')
+        self._async_workers = config_file.get('async_workers', 32)
+        # Пул потоков ("threads") и пул обработчиков asyncio: сверх max_pending
+        # ожидающих соединений отвечаем 503
+        self._worker_threads = config_file.get('worker_threads', 64)
+        self._max_pending = config_file.get('max_pending', 256)
+        self._retry_after = config_file.get('retry_after_seconds', 5)
+        # HTTP/1.1 keep-alive: простой между запросами и лимит запросов на соединение
+        self._keep_alive_timeout = config_file.get('keep_alive_timeout', 15)
+        self._max_keep_alive_requests = config_file.get('max_keep_alive_requests', 100)
+        # Пул "threads": простаивающее keep-alive соединение уступает поток ждущим в очереди
+        self._pool = None
+        # Состояние текущего соединения в потоке-обработчике
+        self._local = threading.local()
+        # workers > 1: несколько процессов на одном порту (см. Supervisor),
+        # логи отправляются супервизору через log_queue
+        self._workers = config_file.get('workers', 1)
+        self._log_queue = log_queue
+        # Очередь к супервизору ограничена: при заполнении строки отбрасываются
+        # (log_overflow="drop", их число попадает в журнал) или поток ждёт ("block")
+        self._log_overflow = config_file.get('log_overflow', 'drop')
+        self._log_dropped = 0
+        self._log_dropped_lock = threading.Lock()
         self._check_folders(self._res_directory,self._html_directory,self._log_directory,self._database_directory)
+        # Журнал пишет фоновый поток; у воркеров Supervisor его роль играет log_queue
+        self._logger = None
+        if log_queue is None:
+            self._logger = AsyncLogger(self._log_directory, self.LOG_NAME_FORMAT,
+                                       max_queue=config_file.get('log_queue_size', 10000),
+                                       flush_interval=config_file.get('log_flush_seconds', 1),
+                                       max_bytes=config_file.get('log_max_mb', 50) * 1024 * 1024,
+                                       overflow=config_file.get('log_overflow', 'drop'))
         self._db = ServerDB(self._database_directory,self._database_name)
+        # bcrypt для auth и reg считается в отдельном пуле с ограничением очереди
+        self._hasher = PasswordHasher(config_file.get('auth_workers', 2),
+                                      config_file.get('auth_max_pending', 32),
+                                      config_file.get('auth_per_ip', 4))
+        # HTML-страницы, иконки и страницы ошибок отдаются из памяти
+        self._static_cache = StaticCache(self._html_directory, self._static_headers,
+                                         max_bytes=config_file.get('static_cache_mb', 16) * 1024 * 1024)
+        self._static_cache.preload()
+        # Дерево res_directory в памяти: list и tree не обходят диск
+        self._storage_index = StorageIndex(self._res_directory, config_file.get('index_rescan_seconds', 5))
+        self._storage_index.build()
+        # Поиск по именам и путям файлов без выгрузки всего list клиенту
+        self._search_index = SearchIndex(self._storage_index)
+        # Журнал запросов: тело не пишется, кроме начала длиной access_log_body_preview байт
+        self._access_log = AccessLog(config_file.get('access_log_headers',
+                                                     ["Host", "User-Agent", "Referer", "Content-Type", "Range"]),
+                                     config_file.get('access_log_body_preview', 0),
+                                     self._remove_auth_line)
+        # Ответы меньше этого размера не сжимаются: выигрыш меньше накладных расходов
+        self._compress_min_bytes = config_file.get('compress_min_bytes', 1024)
 
     def _log(self, content):
-        today = datetime.date.today().strftime("%d.%m.%Y")
-        filename = os.path.join(self._log_directory,f"{today}.txt")
-        with open(filename,"a") as f:
-            f.write(content + '\n')
+        if self._log_queue is None:
+            self._logger.log(content)
+            return
+        if self._log_overflow == "block":
+            self._log_queue.put((os.getpid(), content))
+            return
+        with self._log_dropped_lock:
+            try:
+                if self._log_dropped:
+                    self._log_queue.put_nowait((os.getpid(), f"{self._log_dropped} log lines dropped: log queue is full"))
+                    self._log_dropped = 0
+                self._log_queue.put_nowait((os.getpid(), content))
+            except queue.Full:
+                self._log_dropped += 1
+
+    def _display_text(self, text):
+        print(text)
 
     def _check_folders(self, res_path, html_path,log_directory,database_directory):
         print(f'checking {res_path}')
@@ -95,175 +214,172 @@ class Server:
         with open(file_path, 'r') as config_file:
             return json.load(config_file)
 
-    def _print_tree(self, path, prefix=""):
-        buffer = []
+    def _wants_keep_alive(self, request, served):
+        if served >= self._max_keep_alive_requests:
+            return False
+        connection = request.headers.get('Connection', '').lower()
+        if request.protocol == "HTTP/1.1":
+            return connection != "close"
+        return connection == "keep-alive"
+
+    def _connection_headers(self):
+        if getattr(self._local, 'keep_alive', False):
+            remaining = self._max_keep_alive_requests - self._local.served
+            return {
+                "Connection": "keep-alive",
+                "Keep-Alive": f"timeout={self._keep_alive_timeout}, max={remaining}"
+            }
+        return {"Connection": "close"}
+
+    def _remove_auth_line(self, text):
+        masked_data = re.sub(r'("password":\s*")[^"]*(")', r'\1****\2', text)
+        masked_data = re.sub(r'("(?:refresh_)?token":\s*")[^"]*(")', r'\1****\2', masked_data)
+        return masked_data
+
+    def _handle_client(self, conn, pending=b'', served=0, park=False):
+        """Обслуживает запросы соединения по очереди (keep-alive, конвейер).
+        При park=True простаивающее соединение не ждёт здесь, а возвращается
+        движку: метод отдаёт число обслуженных запросов вместо закрытия."""
+        reader = RequestReader(conn, pending, max_body_size=self.MAX_REQUEST_SIZE)
+        # Все ответы идут через обёртку: она даёт статус и объём для журнала запросов
+        conn = CountingConnection(conn)
+        request = None
+        parked = False
         try:
-            items = os.listdir(path)
+            while True:
+                if not reader.has_buffered() and served:
+                    if park:
+                        parked = True
+                        return served
+                    if not self._wait_keep_alive(reader, conn):
+                        return None
+                conn.settimeout(45)
+                self._local.keep_alive = False
+                self._local.encoding = None
+                request = self._read_full_request(reader)
+                if not request:
+                    return None
+                started = time.monotonic()
+                conn.reset()
+                if self._access_log.preview_bytes:
+                    request.body.capture(self._access_log.preview_bytes)
+
+                served += 1
+                self._local.served = served
+                self._local.keep_alive = self._wants_keep_alive(request, served)
+                self._local.encoding = negotiate(request.headers.get('Accept-Encoding'))
+
+                if request.method == 'GET':
+                    self._handle_get(conn, request)
+                elif request.method == 'POST':
+                    self._handle_post(conn, request)
+                else:
+                    self._send_response(conn, "Method Not Allowed", 405)
+
+                # Непрочитанное тело надо пропустить, иначе сломается разбор следующего
+                # запроса; большое проще не дочитывать, а закрыть соединение
+                if request.body.remaining > 64 * 1024:
+                    self._local.keep_alive = False
+                elif self._local.keep_alive:
+                    request.body.drain()
+
+                self._log_access(request, conn, started)
+                request = None
+                if not self._local.keep_alive:
+                    return None
+        except BadRequest as e:
+            self._local.keep_alive = False
+            self._send_response(conn, str(e), 400)
+        except ValueError as e:
+            self._local.keep_alive = False
+            self._send_response(conn, str(e), 413)
         except Exception as e:
-            buffer.append(f"Error accessing directory {path}: {e}")
-            return buffer
-
-        items.sort()
+            self._local.keep_alive = False
+            self._send_response(conn, f"Internal Server Error: {e}", 500)
+        finally:
+            if request is not None:
+                # Запрос завершился ошибкой - запись в журнал всё равно нужна
+                self._log_access(request, conn, started)
+            if not parked:
+                conn.close()
+        return None
 
-        for index, item in enumerate(items):
-            item_path = os.path.join(path, item)
-            is_last = index == len(items) - 1
+    # Как часто простаивающее соединение проверяет очередь пула, секунды
+    IDLE_POLL_INTERVAL = 0.25
 
-            connector = "|__ " if is_last else "|-- "
+    def _wait_keep_alive(self, reader, conn):
+        """Ждёт следующий запрос не дольше keep_alive_timeout. Пока соединение
+        простаивает, оно занимает поток пула, поэтому ждём короткими отрезками
+        и закрываем его, как только в очереди пула появились новые соединения."""
+        deadline = time.monotonic() + self._keep_alive_timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            conn.settimeout(min(remaining, self.IDLE_POLL_INTERVAL))
             try:
-                item_encoded = item.encode('utf-8').decode('utf-8')
-            except UnicodeDecodeError:
-                item_encoded = item.encode('utf-8', 'replace').decode('utf-8')
-
-            buffer.append(prefix + connector + item_encoded)
-
-            if os.path.isdir(item_path):
-                new_prefix = prefix + ("    " if is_last else "|   ")
-                buffer.extend(self._print_tree(item_path, new_prefix))
-
-        return buffer
-
-    def _create_directory_structure(self, path):
-        structure = {}
+                return reader.receive()
+            except socket.timeout:
+                if self._pool and self._pool.pending():
+                    return False
+            except OSError:
+                # Клиент ушёл
+                return False
+
+    def _log_access(self, request, conn, started):
         try:
-            items = os.listdir(path)
+            record = self._access_log.record((self._local.client_ip, self._local.client_port), request, conn,
+                                             time.monotonic() - started)
         except Exception as e:
-            return {"error": str(e)}
-        for item in items:
-            item_path = os.path.join(path, item)
-            if os.path.isdir(item_path):
-                structure[item] = {
-                    "type": "directory",
-                    "children": self._create_directory_structure(item_path)
-                }
-            else:
-                structure[item] = {
-                    "type": "file"
-                }
-        return structure
+            self._log(f"Access log failed: {e}")
+            return
+        self._display_text(AccessLog.to_text(record))
+        self._log(AccessLog.to_json(record))
 
-    def _read_full_request(self, conn):
-        data = b''
-        while True:
-            chunk = conn.recv(4096)
-            if not chunk:
-                break
-            data += chunk
-
-            # Декодируем только после завершения чтения
-            try:
-                decoded_data = data.decode('utf-8')
-            except UnicodeDecodeError:
-                print("Ошибка декодирования. Проверьте кодировку.")
-                # Можно обработать ошибку или вернуть None
-                return None
-
-            if len(decoded_data) > self.MAX_REQUEST_SIZE:
-                raise ValueError("Request size exceeds limit")
-            if '\r\n\r\n' in decoded_data:
-                headers_part, body_part = decoded_data.split('\r\n\r\n', 1)
-                headers = headers_part.split('\r\n')
-                content_length = 0
-
-                for header in headers:
-                    if header.lower().startswith('content-length:'):
-                        content_length = int(header.split(': ')[1])
-                        break
-
-                if content_length > self.MAX_REQUEST_SIZE:
-                    raise ValueError("Request body too large")
-
-                while len(body_part) < content_length:
-                    chunk = conn.recv(4096)
-                    if not chunk:
-                        break
-                    body_part += chunk.decode('utf-8', errors='ignore')  # Декодируем только тело
-
-                return headers_part + '\r\n\r\n' + body_part
-
-        return None
-
-    def _handle_client(self, conn):
+    def _read_full_request(self, reader):
+        # Ошибки разбора (ValueError) отдаём клиенту, обрыв соединения - просто закрываем
         try:
-            conn.settimeout(45)
-            request = self._read_full_request(conn)
-
-            print(request)
-            self._log(f"{request}")
-
-            print(datetime.datetime.now().strftime("%d.%m.%Y %H:%M:%S"))
-            print("\n"
-                  ".....................................................")
-            print("")
-            self._log(f"..............................................")
-
-
-            if not request:
-                return
-
-            if request.startswith('GET'):
-                self._handle_get(conn, request)
-            elif request.startswith('POST'):
-                self._handle_post(conn, request)
-            else:
-                self._send_response(conn, "Method Not Allowed", 405)
-        except ValueError as e:
-            self._send_response(conn, str(e), 413)
-        except Exception as e:
-            self._send_response(conn, f"Internal Server Error: {e}", 500)
-        finally:
-            conn.close()
+            return reader.read_request()
+        except OSError:
+            return None
 
     def _handle_post(self, conn, request):
         status_code = 200
         content_type = 'text/plain'
         response_body = "Unknown command."
+        headers = None
 
         try:
             post_data = {}
             command = ""
-            # Разделяем заголовки и тело запроса
-            if '\r\n\r\n' not in request:
-                raise ValueError("Invalid request format: missing headers-body separator.")
-
-            headers, body = request.split('\r\n\r\n', 1)
-
-            # Извлекаем Content-Length (если есть)
-            content_length = 0
-            for header_line in headers.split('\r\n'):
-                if header_line.startswith("Content-Length:"):
-                    content_length = int(header_line.split(': ')[1])
-                    break
-
-            # Проверяем, что тело запроса не пустое
-            if not body and content_length > 0:
-                raise ValueError("Empty body in request.")
-
-            # Извлекаем Content-Type (если есть)
-            content_type = 'text/plain'  # Значение по умолчанию
-            for header_line in headers.split('\r\n'):
-                if header_line.startswith("Content-Type:"):
-                    content_type = header_line.split(': ')[1]
-                    break
-
-            # Обрабатываем multipart/form-data
-            if 'multipart/form-data' in content_type:
-                boundary = content_type.split('boundary=')[1]
-                parts = body.split('--' + boundary)
-
-                for part in parts:
-                    if 'filename="' in part:
-                        file_name = part.split('filename="')[1].split('"')[0]
-                        file_content = part.split('\r\n\r\n')[1].rstrip('\r\n--')
-                        file_path = os.path.join(self._res_directory, file_name)
+            content_type = request.headers.get('Content-Type', 'text/plain')
 
-                        with open(file_path, 'wb') as f:
-                            f.write(file_content.encode())
+            # Загрузка сырого файла: тело пишется на диск по частям
+            if "upload" in request.head and 'filename="' in request.head:
+                file_name = request.head.split('filename="')[1].split('"')[0]
+                file_name = self._save_upload(file_name, iter(lambda: request.body.read(1024 * 1024), b''))
+                self._send_response(conn, f"File '{file_name}' uploaded successfully.")
+                return
 
-                        response_body = f"File '{file_name}' uploaded successfully."
-                        break
+            # Обрабатываем multipart/form-data: файлы пишутся на диск по мере чтения
+            if 'multipart/form-data' in content_type:
+                _, params = header_params(content_type)
+                if not params.get('boundary'):
+                    raise BadRequest("Missing multipart boundary")
+                uploaded = []
+                for part in MultipartReader(request.body, params['boundary']).parts():
+                    if part.filename:
+                        uploaded.append(self._save_upload(part.filename, part.chunks()))
+                    elif part.name:
+                        post_data[part.name] = part.read_all(self.MAX_COMMAND_SIZE).decode('utf-8')
+                if uploaded:
+                    self._send_response(conn, "\n".join(
+                        f"File '{file_name}' uploaded successfully." for file_name in uploaded))
+                    return
+                command = post_data.get("command")
             # Обрабатываем application/json
             elif 'application/json' in content_type:
+                body = request.body.read_all(self.MAX_COMMAND_SIZE).decode('utf-8')
                 if not body:
                     raise ValueError("Empty JSON body.")
 
@@ -275,42 +391,39 @@ class Server:
 
             # Обрабатываем обычные form-data
             else:
+                body = request.body.read_all(self.MAX_COMMAND_SIZE).decode('utf-8')
                 for pair in body.split('&'):
                     if '=' in pair:
                         key, value = pair.split('=', 1)
                         post_data[key] = unquote(value)
-                try:
-
-                    command = post_data.get("command")  # Извлекаем команду
-                except json.JSONDecodeError as e:
-                    raise ValueError(f"Invalid JSON: {str(e)}")
-
-
-
-            # Дополнительная логика для обработки команд
-            if "upload" in headers:
-                file_name = headers.split('filename="')[1].split('"')[0]
-                file_path = os.path.join(self._res_directory, file_name)
-
-                with open(file_path, 'wb') as f:
-                    f.write(body.encode()[:content_length])
+                command = post_data.get("command")  # Извлекаем команду
 
             content_type = 'text/plain'
             if command == "status":
                 response_body = "Server is running."
             elif command == "list":
-                token = JWTManager(self._secret)
-                user_token = post_data.get("token")
-                if token.validate_token(user_token):
-                    structure = self._create_directory_structure(self._res_directory)
-                    response_body = json.dumps(structure, indent=2)
+                if self._jwt.user_id(post_data.get("token")) is not None:
+                    if any(key in post_data for key in self.LIST_PAGE_PARAMS):
+                        # Постраничный режим: клиент подгружает папки по мере раскрытия
+                        response_body = json.dumps(self._list_page(post_data))
+                    else:
+                        # Полное дерево может весить мегабайты - отдаём его потоком
+                        fields = self._list_fields(post_data)
+                        self._send_stream(conn, request, self._storage_index.structure_json(fields),
+                                          'application/json')
+                        return
                     content_type = 'application/json'
                 else:
                     response_body = {"status": "error", "message": "Invalid token"}
                     response_body = json.dumps(response_body, indent=2)
-                    self._send_response(conn, response_body)
+            elif command == "search":
+                if self._jwt.user_id(post_data.get("token")) is not None:
+                    response_body = json.dumps(self._search_page(post_data))
+                    content_type = 'application/json'
+                else:
+                    response_body = json.dumps({"status": "error", "message": "Invalid token"}, indent=2)
             elif command == "tree":
-                tree_lines = self._print_tree(self._res_directory)
+                tree_lines = self._storage_index.tree_lines()
                 response_body = "\n".join(tree_lines)
             elif command == "version":
                 response_body = f"Current version is {self._version}"
@@ -326,24 +439,39 @@ class Server:
                 elif not password:
                     response_body = {"status": "Password is required."}
                     response_body = json.dumps(response_body)
-
-
-                check_result = self._db.check_user(login, password)
-                if check_result:
-                    token = JWTManager(self._secret)
-                    user_id = self._db.get_user_id_by_login(login)
-                    encode_token = token.encode(user_id)
-
-                    response_body = {
-                        "status": "success",
-                        f"token": f"{encode_token}"
-                    }
-                    response_body = json.dumps(response_body)
                 else:
-                    response_body = {
-                        "status": "auth error"
-                    }
-                    response_body = json.dumps(response_body)
+                    client_ip = self._local.client_ip
+                    user = self._db.authenticate(login, password,
+                                                 lambda password, hashed: self._hasher.check(password, hashed, client_ip))
+                    if user:
+                        response_body = json.dumps(self._issue_tokens(user["id"]))
+                    else:
+                        response_body = {
+                            "status": "auth error"
+                        }
+                        response_body = json.dumps(response_body)
+            elif command == "refresh":
+                # Новый access-токен без пароля и bcrypt: подпись refresh-токена и одна запись в базе
+                payload = self._jwt.decode_refresh(post_data.get("refresh_token"))
+                if payload and self._db.use_refresh_token(payload['jti'], payload['user_id']):
+                    response_body = json.dumps(self._issue_tokens(payload['user_id']))
+                else:
+                    response_body = json.dumps({"status": "error", "message": "Invalid refresh token"})
+                    status_code = 401
+                content_type = 'application/json'
+            elif command == "logout":
+                # Отзывает refresh-токен, а с all=true - все refresh-токены пользователя
+                payload = self._jwt.decode_refresh(post_data.get("refresh_token"))
+                if payload:
+                    if post_data.get("all") in (True, "true", "1"):
+                        self._db.revoke_user_tokens(payload['user_id'])
+                    else:
+                        self._db.revoke_refresh_token(payload['jti'])
+                    response_body = json.dumps({"status": "success"})
+                else:
+                    response_body = json.dumps({"status": "error", "message": "Invalid refresh token"})
+                    status_code = 401
+                content_type = 'application/json'
             elif command == "reg":
                 login = post_data.get("login")
                 password = post_data.get("password")
@@ -353,21 +481,24 @@ class Server:
                     response_body = {"status": "Password is required."}
                 else:
                     content_type = "application/json"
-                    self._db.insert_user(login, password)
+                    hashed_password = self._hasher.hash(password, self._local.client_ip)
+                    self._db.insert_user(login, password, hashed_password=hashed_password)
                     message1 = f"User {login} registered successfully."
                     message2 = f"Add {login} to db successfully."
                     time = datetime.datetime.now().strftime("%d-%m-%Y %H:%M:%S")
-                    print(message1)
-                    print(message2)
-                    print(time)
+                    self._display_text(message1)
+                    self._display_text(message2)
+                    self._display_text(time)
                     self._log(f"{message1}\n{message2}\n{time}")
-                    if self._db.check_user(login, password):
-                        response_body = {"status":"success"}
-                    response_body = json.dumps(response_body)
+                    response_body = json.dumps({"status": "success"})
             else:
                 response_body = {"status": "unsupported"}
                 response_body = json.dumps(response_body)
                 status_code = 400
+        except HasherBusy as e:
+            response_body = json.dumps({"status": "error", "message": str(e)})
+            status_code = 429
+            headers = {"Retry-After": self._retry_after}
         except JSONDecodeError as e:
             response_body = {"status": "error", "message": str(e)}
             response_body = json.dumps(response_body)
@@ -381,13 +512,104 @@ class Server:
             response_body = json.dumps(response_body)
             status_code = 500
 
-        self._send_response(conn, response_body, status_code, content_type)
+        self._send_response(conn, response_body, status_code, content_type, headers)
+
+    LIST_PAGE_PARAMS = ("path", "depth", "limit", "cursor")
+
+    def _list_page(self, post_data):
+        """Одна страница list: path - папка, depth - глубина обхода (1 - только её
+        содержимое), limit - размер страницы, cursor - продолжение с прошлой страницы."""
+        path = post_data.get("path") or ""
+        depth = int(post_data.get("depth") or 1)
+        limit = min(int(post_data.get("limit") or 100), 1000)
+        if depth < 1 or limit < 1:
+            raise ValueError("depth and limit must be positive")
+        after = None
+        if post_data.get("cursor"):
+            after = self._decode_cursor(post_data["cursor"])
+        try:
+            entries, last = self._storage_index.page(path, depth, limit, after, self._list_fields(post_data))
+        except KeyError:
+            raise ValueError(f"Directory not found: {path}")
+        cursor = base64.urlsafe_b64encode(last.encode('utf-8')).decode() if last else None
+        return {"path": path, "entries": entries, "cursor": cursor}
+
+    @staticmethod
+    def _decode_cursor(cursor):
+        # urlsafe_b64decode молча выбрасывает чужие символы, и испорченный курсор
+        # начинал бы выдачу сначала; validate=True отвергает его
+        if not isinstance(cursor, str):
+            raise ValueError("Invalid cursor")
+        try:
+            return base64.b64decode(cursor, altchars=b'-_', validate=True).decode('utf-8')
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("Invalid cursor")
+
+    def _issue_tokens(self, user_id):
+        refresh_token, jti, expires_at = self._jwt.encode_refresh(user_id)
+        self._db.add_refresh_token(jti, user_id, expires_at)
+        return {
+            "status": "success",
+            "token": self._jwt.encode(user_id),
+            "refresh_token": refresh_token
+        }
+
+    def _search_page(self, post_data):
+        """Страница результатов search: query - строка поиска, mode - prefix,
+        substring или glob, limit - размер страницы, cursor - продолжение."""
+        query = post_data.get("query") or ""
+        if not query:
+            raise ValueError("query is required")
+        mode = post_data.get("mode") or "substring"
+        limit = min(int(post_data.get("limit") or 50), 1000)
+        if limit < 1:
+            raise ValueError("limit must be positive")
+        offset = 0
+        if post_data.get("cursor"):
+            offset = self._decode_cursor(post_data["cursor"])
+            if not offset.isdigit():
+                raise ValueError("Invalid cursor")
+            offset = int(offset)
+        matches = self._search_index.search(query, mode)
+        results = [{"path": path, "name": path.rsplit("/", 1)[-1]} for path in matches[offset:offset + limit]]
+        next_offset = offset + limit
+        cursor = base64.urlsafe_b64encode(str(next_offset).encode()).decode() if next_offset < len(matches) else None
+        return {"query": query, "mode": mode, "total": len(matches), "results": results, "cursor": cursor}
+
+    def _list_fields(self, post_data):
+        """fields - список или строка через запятую из size, mtime, hash."""
+        fields = post_data.get("fields") or []
+        if isinstance(fields, str):
+            fields = [field.strip() for field in fields.split(',') if field.strip()]
+        if not isinstance(fields, list) or not all(field in self._storage_index.FIELDS for field in fields):
+            raise ValueError(f"fields must be a subset of {', '.join(self._storage_index.FIELDS)}")
+        return tuple(fields)
+
+    def _save_upload(self, file_name, chunks):
+        """Пишет файл во временный файл в res_directory и атомарно
+        переименовывает его, поэтому недокачанный файл никогда не виден под своим именем."""
+        file_name = os.path.basename(file_name.replace('\\', '/'))
+        if file_name in ("", ".", ".."):
+            raise BadRequest("Invalid file name")
+        fd, temp_path = tempfile.mkstemp(dir=self._res_directory, prefix=".upload-", suffix=".part")
+        try:
+            size = 0
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.MAX_FILE_SIZE:
+                        raise RequestTooLarge("File size exceeds limit")
+                    f.write(chunk)
+            os.replace(temp_path, os.path.join(self._res_directory, file_name))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        self._storage_index.add_file(file_name)
+        return file_name
 
     def _handle_get(self, conn, request):
         try:
-            request_line = request.split('\r\n')[0]
-            method, path, protocol = request_line.split()
-            path = path.lstrip('/')
+            path = request.target.lstrip('/')
             path = unquote(path)
 
             if path == "":
@@ -407,17 +629,29 @@ class Server:
             else:
                 full_path = os.path.join(self._res_directory, path)
 
+            full_path = os.path.normpath(full_path)
+            if not full_path.startswith((self._html_directory + os.sep, self._res_directory + os.sep)):
+                # "../" в пути не должен выводить за пределы каталогов сервера
+                self._serve_404(conn)
+                return
+
+            if full_path.startswith(self._html_directory + os.sep) and 'Range' not in request.headers:
+                cached = self._static_cache.get(full_path)
+                if cached is not None:
+                    self._serve_cached(conn, request, cached)
+                    return
+
             if os.path.isfile(full_path):
                 if full_path.endswith('.html'):
-                    self._serve_html_file(conn, full_path)
+                    self._serve_html_file(conn, full_path, request)
                 else:
-                    self._serve_file(conn, full_path)
+                    self._serve_file(conn, full_path, request)
             else:
                 self._serve_404(conn)
         except Exception as e:
             self._send_response(conn, "Bad Request", 400)
 
-    def _serve_file(self, conn, file_path):
+    def _serve_file(self, conn, file_path, request=None):
         try:
             if not os.path.isfile(file_path):
                 self._send_response(conn, "Not Found", 404)
@@ -433,56 +667,314 @@ class Server:
                 return
 
             file_name = os.path.basename(file_path)
-            file_size = os.path.getsize(file_path)
 
-            headers = [
-                "HTTP/1.1 200 OK",
-                "Content-Type: application/octet-stream",
-                f"Content-Length: {file_size}",
-                f"Content-Disposition: attachment; filename=\"{file_name}\"",
-                "\r\n"
-            ]
+            # 304 решаем по stat, не открывая файл
+            if self._serve_not_modified(conn, request, file_path, os.stat(file_path)):
+                return
 
-            conn.sendall("\r\n".join(headers).encode())
+            if self._serve_gzip_sibling(conn, request, file_path):
+                return
 
             with open(file_path, 'rb') as f:
-                while chunk := f.read(4096):
-                    try:
-                        conn.sendall(chunk)
-                    except (ConnectionResetError, BrokenPipeError):
-                        print(f"Connection lost while sending file: {file_path}")
-                        break
-                    except Exception as e:
-                        print(e)
-                        return
+                # Размер берём у открытого файла, чтобы Content-Length совпал с отправленным
+                stat = os.fstat(f.fileno())
+                file_size = stat.st_size
+                headers = {
+                    "Accept-Ranges": "bytes",
+                    **self._cache_headers(file_path, stat),
+                    "Content-Disposition": f"attachment; filename=\"{file_name}\"",
+                    **self._connection_headers()
+                }
+
+                ranges = None
+                if request is not None and 'Range' in request.headers and self._if_range_matches(request, stat):
+                    ranges = parse_range(request.headers['Range'], file_size)
+
+                try:
+                    if ranges == []:
+                        self._send_response_headers(conn, 416, {
+                            "Content-Range": f"bytes */{file_size}",
+                            "Content-Length": 0,
+                            **headers
+                        })
+                    elif ranges:
+                        self._send_ranges(conn, f, ranges, file_size, headers)
+                    else:
+                        self._send_response_headers(conn, 200, {
+                            "Content-Type": "application/octet-stream",
+                            "Content-Length": file_size,
+                            **headers
+                        })
+                        if self._send_file_body(conn, f, 0, file_size) < file_size:
+                            # Файл укоротился во время отправки - ответ неполный, соединение не переиспользуем
+                            self._local.keep_alive = False
+                except (ConnectionResetError, BrokenPipeError):
+                    self._display_text(f"Connection lost while sending file: {file_path}")
+                    self._local.keep_alive = False
+                except Exception as e:
+                    self._display_text(e)
+                    self._local.keep_alive = False
         except Exception as e:
             print(f"Error serving file {file_path}: {e}")
             self._send_response(conn, "Internal Server Error", 500)
 
-    def _serve_html_file(self, conn, file_path):
+    def _serve_gzip_sibling(self, conn, request, file_path):
+        """Файлы html_directory, не попавшие в кеш, отдаются готовым file.gz, если он
+        свежий и клиент принимает gzip. Для Range отдаём исходный файл."""
+        if request is None or 'Range' in request.headers or self._local.encoding != "gzip":
+            return False
+        if not (file_path.startswith(self._html_directory + os.sep) and is_compressible_file(file_path)):
+            return False
+        stat = os.stat(file_path)
+        sibling = gzip_sibling(file_path, stat)
+        if sibling is None:
+            return False
+        with open(sibling, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            cache_headers = self._cache_headers(file_path, stat)
+            self._send_response_headers(conn, 200, {
+                "Content-Type": "application/octet-stream",
+                "Content-Length": size,
+                "Content-Encoding": "gzip",
+                "Vary": "Accept-Encoding",
+                **cache_headers,
+                "ETag": cache_headers["ETag"] if cache_headers["ETag"].startswith("W/") else f"W/{cache_headers['ETag']}",
+                "Content-Disposition": f"attachment; filename=\"{os.path.basename(file_path)}\"",
+                **self._connection_headers()
+            })
+            if self._send_file_body(conn, f, 0, size) < size:
+                self._local.keep_alive = False
+        return True
+
+    def _if_range_matches(self, request, stat):
+        """If-Range: Range учитывается, только если файл не менялся (ETag сравнивается строго)."""
+        if_range = request.headers.get('If-Range')
+        if if_range is None:
+            return True
+        if if_range.startswith(('"', 'W/')):
+            return if_range == self._etag(stat)
+        try:
+            return int(parsedate_to_datetime(if_range).timestamp()) == int(stat.st_mtime)
+        except (TypeError, ValueError):
+            return False
+
+    def _send_ranges(self, conn, f, ranges, file_size, headers):
+        """206 Partial Content: один диапазон - напрямую, несколько - multipart/byteranges."""
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            self._send_response_headers(conn, 206, {
+                "Content-Type": "application/octet-stream",
+                "Content-Length": end - start + 1,
+                "Content-Range": f"bytes {start}-{end}/{file_size}",
+                **headers
+            })
+            if self._send_file_body(conn, f, start, end - start + 1) < end - start + 1:
+                self._local.keep_alive = False
+            return
+
+        boundary = uuid.uuid4().hex
+        part_heads = [
+            (f"\r\n--{boundary}\r\n"
+             f"Content-Type: application/octet-stream\r\n"
+             f"Content-Range: bytes {start}-{end}/{file_size}\r\n\r\n").encode()
+            for start, end in ranges
+        ]
+        tail = f"\r\n--{boundary}--\r\n".encode()
+        content_length = sum(len(head) for head in part_heads) + len(tail) + \
+            sum(end - start + 1 for start, end in ranges)
+        self._send_response_headers(conn, 206, {
+            "Content-Type": f"multipart/byteranges; boundary={boundary}",
+            "Content-Length": content_length,
+            **headers
+        })
+        for head, (start, end) in zip(part_heads, ranges):
+            conn.sendall(head)
+            if self._send_file_body(conn, f, start, end - start + 1) < end - start + 1:
+                self._local.keep_alive = False
+                return
+        conn.sendall(tail)
+
+    def _send_file_body(self, conn, f, offset, count):
+        """Отправляет count байт файла с позиции offset, возвращает число отправленных.
+        Где есть os.sendfile, байты идут из page cache в сокет без копирования в Python."""
+        if hasattr(os, 'sendfile'):
+            return conn.sendfile(f, offset, count)
+        f.seek(offset)
+        buffer = bytearray(self.SEND_BUFFER_SIZE)
+        view = memoryview(buffer)
+        sent = 0
+        while sent < count:
+            read = f.readinto(view[:min(len(buffer), count - sent)])
+            if not read:
+                break
+            conn.sendall(view[:read])
+            sent += read
+        return sent
+
+    def _serve_html_file(self, conn, file_path, request=None):
 
         try:
+            stat = os.stat(file_path)
+            if self._serve_not_modified(conn, request, file_path, stat):
+                return
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
-            self._send_response(conn, content, content_type='text/html')
+            self._send_response(conn, content, content_type='text/html',
+                                headers=self._cache_headers(file_path, stat))
         except FileNotFoundError:
             self._serve_404(conn)
 
-    def _send_response(self, conn, content, status_code=200, content_type='text/plain'):
+    def _static_headers(self, file_path, stat, size):
+        # Те же заголовки, что выставляют _serve_html_file и _serve_file
+        if file_path.endswith('.html'):
+            headers = {"Content-Type": "text/html"}
+        else:
+            headers = {
+                "Content-Type": "application/octet-stream",
+                "Accept-Ranges": "bytes",
+                "Content-Disposition": f"attachment; filename=\"{os.path.basename(file_path)}\""
+            }
+        headers["Content-Length"] = size
+        headers.update(self._cache_headers(file_path, stat))
+        if is_compressible_file(file_path):
+            headers["Vary"] = "Accept-Encoding"
+        return headers
+
+    def _serve_cached(self, conn, request, cached):
+        if self._serve_not_modified(conn, request, cached.path, cached.stat):
+            return
+        encoding = self._local.encoding
+        if encoding and is_compressible_file(cached.path):
+            variant = self._static_cache.variant(cached, encoding)
+            if variant:
+                self._send_bytes(conn, 200, *variant)
+                return
+        self._send_bytes(conn, 200, cached.head, cached.body)
+
+    def _send_bytes(self, conn, status_code, head, body):
+        # head - уже закодированные строки заголовков; добавляем только Connection
+        connection = "".join(f"{k}: {v}\r\n" for k, v in self._connection_headers().items())
+        status_line = f"HTTP/1.1 {status_code} {self._get_status_text(status_code)}\r\n"
+        conn.sendall(status_line.encode() + head + connection.encode() + b"\r\n" + body)
+
+    def _serve_error_page(self, conn, status_code, page, fallback):
+        cached = self._static_cache.get(os.path.join(self._html_directory, page))
+        if cached is None:
+            self._send_response(conn, fallback, status_code)
+            return
+        head = f"Content-Type: text/html\r\nContent-Length: {len(cached.body)}\r\n".encode()
+        self._send_bytes(conn, status_code, head, cached.body)
+
+    def _etag(self, stat, weak=False):
+        # inode, размер и mtime в наносекундах меняются при любой перезаписи файла
+        tag = f'"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+        return f"W/{tag}" if weak else tag
+
+    def _cache_headers(self, file_path, stat):
+        # HTML отдаётся перекодированным, поэтому для него ETag слабый
+        in_html_directory = file_path.startswith(self._html_directory + os.sep)
+        return {
+            "ETag": self._etag(stat, weak=file_path.endswith('.html')),
+            "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+            "Cache-Control": self._cache_control_html if in_html_directory else self._cache_control_res
+        }
+
+    def _is_not_modified(self, request, stat):
+        if request is None:
+            return False
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match is not None:
+            # Для If-None-Match сравнение слабое: W/ не учитывается
+            if if_none_match.strip() == '*':
+                return True
+            current = self._etag(stat)
+            return any(tag.strip().removeprefix('W/') == current for tag in if_none_match.split(','))
+        if_modified_since = request.headers.get('If-Modified-Since')
+        if if_modified_since is not None:
+            try:
+                return int(stat.st_mtime) <= int(parsedate_to_datetime(if_modified_since).timestamp())
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _serve_not_modified(self, conn, request, file_path, stat):
+        if not self._is_not_modified(request, stat):
+            return False
+        self._send_response_headers(conn, 304, {
+            **self._cache_headers(file_path, stat),
+            **self._connection_headers()
+        })
+        return True
+
+    def _send_response(self, conn, content, status_code=200, content_type='text/plain', headers=None):
+        # Content-Length считаем в байтах: при keep-alive по нему клиент ищет конец ответа
+        body = content.encode()
         headers = {
             "Content-Type": content_type,
-            "Connection": "close"
+            **(headers or {}),
+            **self._connection_headers()
         }
+        if is_compressible(content_type) and len(body) >= self._compress_min_bytes:
+            headers["Vary"] = "Accept-Encoding"
+            encoding = getattr(self._local, 'encoding', None)
+            if encoding:
+                body = compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                if "ETag" in headers and not headers["ETag"].startswith("W/"):
+                    headers["ETag"] = f"W/{headers['ETag']}"
 
         response = [
             f"HTTP/1.1 {status_code} {self._get_status_text(status_code)}",
-            f"Content-Length: {len(content)}",
+            f"Content-Length: {len(body)}",
             *[f"{k}: {v}" for k, v in headers.items()],
             "\r\n"
         ]
 
         header_data = "\r\n".join(response)
-        conn.sendall(header_data.encode() + content.encode())
+        conn.sendall(header_data.encode() + body)
+
+    STREAM_CHUNK_SIZE = 64 * 1024
+
+    def _send_stream(self, conn, request, fragments, content_type):
+        """Отдаёт ответ 200 из генератора строк по мере их появления: для HTTP/1.1 -
+        chunked, для HTTP/1.0 - до закрытия соединения. Мелкие фрагменты
+        копятся до STREAM_CHUNK_SIZE, чтобы не слать крошечные куски."""
+        chunked = request.protocol == "HTTP/1.1"
+        if not chunked:
+            self._local.keep_alive = False
+        headers = {"Content-Type": content_type}
+        compressor = None
+        if is_compressible(content_type):
+            headers["Vary"] = "Accept-Encoding"
+            encoding = getattr(self._local, 'encoding', None)
+            if encoding:
+                compressor = StreamCompressor(encoding)
+                headers["Content-Encoding"] = encoding
+        if chunked:
+            headers["Transfer-Encoding"] = "chunked"
+        self._send_response_headers(conn, 200, {**headers, **self._connection_headers()})
+
+        def send_chunk(data):
+            if data:
+                conn.sendall(b"%X\r\n%s\r\n" % (len(data), data) if chunked else data)
+
+        try:
+            buffer, size = [], 0
+            for fragment in fragments:
+                buffer.append(fragment)
+                size += len(fragment)
+                if size >= self.STREAM_CHUNK_SIZE:
+                    data = "".join(buffer).encode()
+                    send_chunk(compressor.compress(data) if compressor else data)
+                    buffer, size = [], 0
+            data = "".join(buffer).encode()
+            send_chunk(compressor.compress(data) + compressor.finish() if compressor else data)
+            if chunked:
+                conn.sendall(b"0\r\n\r\n")
+        except Exception as e:
+            # Заголовки уже ушли, ответ с ошибкой отправить нельзя - только оборвать соединение
+            self._local.keep_alive = False
+            self._log(f"Stream aborted: {e}")
 
     def _send_response_headers(self, conn, status_code, headers):
         response = [
@@ -496,59 +988,93 @@ class Server:
     def _get_status_text(self, status_code):
         return {
             200: 'OK',
+            206: 'Partial Content',
+            304: 'Not Modified',
             400: 'Bad Request',
+            401: 'Unauthorized',
             403: 'Forbidden',
             404: 'Not Found',
             405: 'Method Not Allowed',
             413: 'Payload Too Large',
-            500: 'Internal Server Error'
+            416: 'Range Not Satisfiable',
+            429: 'Too Many Requests',
+            500: 'Internal Server Error',
+            503: 'Service Unavailable'
         }.get(status_code, 'Unknown Status')
 
     def _serve_404(self, conn):
-        error_path = os.path.join(self._html_directory, '404.html')
-        if os.path.exists(error_path):
-            with open(error_path, 'r') as f:
-                content = f.read()
-            self._send_response(conn, content, 404, "text/html")
-        else:
-            self._send_response(conn, "Not Found", 404)
+        self._serve_error_page(conn, 404, '404.html', "Not Found")
 
     def _serve_413(self, conn):
-        error_path = os.path.join(self._html_directory, '413.html')
-        if os.path.exists(error_path):
-            with open(error_path, 'r') as f:
-                content = f.read()
-            self._send_response(conn, content, 404, "text/html")
-        else:
-            self._send_response(conn, "Payload Too Large", 404)
+        self._serve_error_page(conn, 413, '413.html', "Payload Too Large")
+
+    def _serve_connection(self, conn, addr, pending=b'', served=None):
+        # served=None - новое соединение, иначе asyncio-движок возвращает
+        # простаивавшее keep-alive соединение
+        self._local.client_ip, self._local.client_port = addr[0], addr[1]
+        if served is None:
+            served = 0
+        return self._handle_client(conn, pending, served, park=self._engine == "asyncio")
+
+    def _serve_503(self, conn):
+        content = "Server is busy, try again later".encode()
+        try:
+            self._send_response_headers(conn, 503, {
+                "Content-Type": "text/plain",
+                "Content-Length": len(content),
+                "Retry-After": self._retry_after,
+                "Connection": "close"
+            })
+            conn.sendall(content)
+        except OSError:
+            pass
+        finally:
+            conn.close()
 
-    def start(self):
+    def _create_listener(self):
         server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if self._workers > 1:
+            # Каждый воркер слушает свой сокет, ядро распределяет соединения
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         server.bind((self._host, self._port))
-        server.listen(50)
+        server.listen(socket.SOMAXCONN if self._engine == "asyncio" else 50)
+        return server
+
+    def start(self, server=None):
+        # server - уже открытый сокет, унаследованный от Supervisor
+        if server is None:
+            server = self._create_listener()
+        self._storage_index.start()
         line = f'| Server running on http://{self._host}:{self._port} { datetime.datetime.now().strftime("%d.%m.%Y %H:%M:%S")} |'
         self._log(line)
-        print("+"* len(line))
-        print(line)
-        print("+" * len(line))
-        flag = True
+        self._display_text("+" * len(line))
+        self._display_text(line)
+        self._display_text("+" * len(line))
+        pool = None
         try:
-            while flag:
-                conn, addr = server.accept()
-                line = f"Connected to IP: {addr[0]}\nPORT: {addr[1]}\nDATE: " + datetime.datetime.now().strftime("%d.%m.%Y %H:%M:%S")+"\n"
-
-                print("-" * len(line))
-                self._log("-" * len(line))
-                self._log(line)
-                print(line)
-                client_thread = threading.Thread(target=self._handle_client, args=(conn,))
-                client_thread.start()
+            if self._engine == "asyncio":
+                engine = AsyncEngine(self._serve_connection, workers=self._async_workers,
+                                     idle_timeout=self._keep_alive_timeout, max_pending=self._max_pending,
+                                     retry_after=self._retry_after, log=self._log)
+                engine.serve(server)
+            else:
+                pool = self._pool = WorkerPool(self._worker_threads, self._max_pending)
+                while True:
+                    conn, addr = server.accept()
+                    if not pool.submit(self._serve_connection, conn, addr):
+                        self._log(f"Queue is full, rejecting {addr[0]}:{addr[1]}")
+                        self._serve_503(conn)
         except KeyboardInterrupt:
             print("Остановка сервера...")
         finally:
+            if pool:
+                pool.shutdown()
+            self._hasher.shutdown()
             server.close()
             print(f"Сервер остановлен.\n{datetime.datetime.now().strftime('%d.%m.%Y %H:%M:%S')}")
             self._log(f"Сервер остановлен.\n{datetime.datetime.now().strftime('%d.%m.%Y %H:%M:%S')}")
+            if self._logger:
+                self._logger.close()
 
     def __del__(self):
         print("+++++++++++++++++++++++++++++")
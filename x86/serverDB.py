@@ -1,39 +1,194 @@
+import multiprocessing
+import os
 import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
 import bcrypt
 
+from passwordHasher import hash_password
+
 
 class ServerDB:
+    # Ожидание блокировки записи другим соединением, мс
+    BUSY_TIMEOUT_MS = 5000
+    # Сколько записей пользователей держать в памяти
+    USER_CACHE_SIZE = 10000
+
     def __init__(self, path, name):
-        self._conn = sqlite3.connect(f"{path}/{name}.db", check_same_thread=False)
-        self._cursor = self._conn.cursor()
-        self._cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                login TEXT NOT NULL UNIQUE,
-                password BLOB NOT NULL,  
-                role TEXT NOT NULL DEFAULT 'user'
-            )
-        ''')
+        self._path = f"{path}/{name}.db"
+        # У каждого потока своё соединение: курсоры не делятся между потоками,
+        # а в режиме WAL чтения идут параллельно с записью
+        self._local = threading.local()
+        self._connections = {}
+        self._connections_lock = threading.Lock()
+        # login -> (id, login, password, role), только существующие пользователи.
+        # Сбрасывается методами этого класса, изменяющими пользователей, и целиком -
+        # при изменении users_version, который триггеры увеличивают на любой записи
+        # в users (другой воркер Supervisor, userTool.py, ручная правка базы)
+        self._users = OrderedDict()
+        self._logins_by_id = {}
+        self._users_lock = threading.Lock()
+        # Растёт при каждом сбросе: запись, прочитанная до изменения, в кеш не попадёт
+        self._users_version = 0
+        # Значение users_version из базы, которому соответствует кеш
+        self._db_users_version = None
+        conn = self._connection()
+        # WAL сохраняется в самом файле базы, достаточно включить один раз
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    login TEXT NOT NULL UNIQUE,
+                    password BLOB NOT NULL,
+                    role TEXT NOT NULL DEFAULT 'user'
+                )
+            ''')
+            # Выданные refresh-токены: по jti токен можно отозвать до истечения срока
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS refresh_tokens (
+                    jti TEXT PRIMARY KEY,
+                    user_id INTEGER NOT NULL,
+                    expires_at INTEGER NOT NULL,
+                    revoked INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS refresh_tokens_user ON refresh_tokens (user_id)")
+            # Для постраничной выборки с фильтром по роли; префикс login ищется по индексу UNIQUE
+            conn.execute("CREATE INDEX IF NOT EXISTS users_role_id ON users (role, id)")
+            # Счётчик изменений users, общий для всех процессов, работающих с базой
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS users_version (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    version INTEGER NOT NULL
+                )
+            ''')
+            conn.execute("INSERT OR IGNORE INTO users_version (id, version) VALUES (0, 0)")
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                conn.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS users_version_{event.lower()} AFTER {event} ON users
+                    BEGIN
+                        UPDATE users_version SET version = version + 1 WHERE id = 0;
+                    END
+                ''')
         self.ensure_admin()  # Проверяем наличие админа при инициализации
 
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=self.BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+            # NORMAL в режиме WAL не теряет целостность, но не ждёт fsync на каждый commit
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={self.BUSY_TIMEOUT_MS}")
+            self._local.conn = conn
+            with self._connections_lock:
+                # Соединения завершившихся потоков закрываем, чтобы они не копились
+                for thread in [thread for thread in self._connections if not thread.is_alive()]:
+                    self._connections.pop(thread).close()
+                self._connections[threading.current_thread()] = conn
+        return conn
+
+    def _fetchone(self, query, params=()):
+        return self._connection().execute(query, params).fetchone()
+
+    def _write(self, *statements):
+        # Короткая транзакция: все запросы разом и сразу commit
+        conn = self._connection()
+        with conn:
+            for query, params in statements:
+                cursor = conn.execute(query, params)
+        return cursor
+
+    def _sync_users(self):
+        # PRAGMA data_version соединения меняется, только когда базу изменило другое
+        # соединение; тогда сверяем users_version и при расхождении сбрасываем кеш.
+        # Пока data_version прежний, кеш проверяется без чтения таблиц
+        conn = self._connection()
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == getattr(self._local, 'data_version', None):
+            return
+        version = conn.execute("SELECT version FROM users_version WHERE id = 0").fetchone()[0]
+        with self._users_lock:
+            if version != self._db_users_version:
+                self._users_version += 1
+                self._users.clear()
+                self._logins_by_id.clear()
+                self._db_users_version = version
+        self._local.data_version = data_version
+
+    def _user_record(self, login):
+        self._sync_users()
+        with self._users_lock:
+            if login in self._users:
+                self._users.move_to_end(login)
+                return self._users[login]
+            version = self._users_version
+        record = self._fetchone("SELECT id, login, password, role FROM users WHERE login = ?", (login,))
+        with self._users_lock:
+            # Отсутствие пользователя не кешируем: его могут зарегистрировать в другом процессе
+            if not record or version != self._users_version:
+                return record
+            self._users[login] = record
+            self._logins_by_id[record[0]] = login
+            while len(self._users) > self.USER_CACHE_SIZE:
+                _, evicted = self._users.popitem(last=False)
+                self._logins_by_id.pop(evicted[0], None)
+        return record
+
+    def _forget(self, login=None, user_id=None):
+        with self._users_lock:
+            self._users_version += 1
+            if user_id is not None:
+                login = self._logins_by_id.pop(user_id, login)
+            record = self._users.pop(login, None)
+            if record:
+                self._logins_by_id.pop(record[0], None)
+
+    def authenticate(self, login, password, checkpw=None):
+        """Проверяет пароль и возвращает {"id", "login", "role"} или None.
+        Запись пользователя берётся одним запросом (или из кеша); checkpw(password, hash)
+        позволяет считать bcrypt вне вызывающего потока."""
+        record = self._user_record(login)
+        if not record:
+            return None
+        checkpw = checkpw or (lambda password, hashed: bcrypt.checkpw(password.encode(), hashed))
+        if not checkpw(password, record[2]):
+            return None
+        return {"id": record[0], "login": record[1], "role": record[3]}
+
+    def get_role(self, user_id):
+        # Роль без обращения к SQLite, если пользователь уже в кеше
+        self._sync_users()
+        with self._users_lock:
+            login = self._logins_by_id.get(user_id)
+        if login is None:
+            result = self._fetchone("SELECT login FROM users WHERE id = ?", (user_id,))
+            if not result:
+                return None
+            login = result[0]
+        record = self._user_record(login)
+        return record[3] if record and record[0] == user_id else None
+
     def ensure_admin(self):
         # Проверяем, есть ли администратор
-        self._cursor.execute("SELECT * FROM users WHERE login = ?", ("admin",))
-        if not self._cursor.fetchone():
+        if not self._fetchone("SELECT * FROM users WHERE login = ?", ("admin",)):
             # Хешируем пароль для админа
             password = "admin"
             self.insert_user("admin", password, role='admin')  # Добавляем админа
 
-    def insert_user(self, login, password, role='user'):
-        hashed_password = bcrypt.hashpw(password.encode(), bcrypt.gensalt())  # Хешируем пароль
-        self._cursor.execute("INSERT INTO users (login, password, role) VALUES (?, ?, ?)",
-                             (login, hashed_password, role))
-        self._conn.commit()
+    def insert_user(self, login, password, role='user', hashed_password=None):
+        # hashed_password - хеш, уже посчитанный вызывающим (например, в пуле PasswordHasher)
+        if hashed_password is None:
+            hashed_password = bcrypt.hashpw(password.encode(), bcrypt.gensalt())  # Хешируем пароль
+        self._write(("INSERT INTO users (login, password, role) VALUES (?, ?, ?)",
+                     (login, hashed_password, role)))
+        self._forget(login)
 
 
     def get_user(self, login):
-        self._cursor.execute("SELECT id, login, password, role FROM users WHERE login = ?", (login,))
-        result = self._cursor.fetchone()
+        result = self._user_record(login)
         if result:
             return {
                 "id": result[0],
@@ -58,48 +213,168 @@ class ServerDB:
     #     self._conn.commit()
 
     def update_role(self,user_id,new_role):
-        self._cursor.execute("UPDATE users SET role = ? WHERE id = ?",(new_role,user_id))
-        self._conn.commit()
+        self._write(("UPDATE users SET role = ? WHERE id = ?", (new_role, user_id)))
+        self._forget(user_id=user_id)
 
     def check_user(self, login, password):
         # Проверяем, существует ли пользователь и совпадают ли пароли
-        self._cursor.execute("SELECT password FROM users WHERE login = ?", (login,))
-        result = self._cursor.fetchone()
+        return self.authenticate(login, password) is not None
 
-        if result:
-            hashed_password = result[0]  # Это должно быть BLOB
-            return bcrypt.checkpw(password.encode(), hashed_password)  # Проверяем пароль
-        return False  # Пользователь не найден
+    def get_password_hash(self, login):
+        # Хеш для проверки пароля вне потока запроса или None, если пользователя нет
+        result = self._user_record(login)
+        return result[2] if result else None
 
     def get_users(self):
-        self._cursor.execute('SELECT * FROM users')
-        return self._cursor.fetchall()
+        return self._connection().execute('SELECT * FROM users').fetchall()
 
-    def fetch_users(self):
-        self._cursor.execute("SELECT id, login, role FROM users")
-        users = self._cursor.fetchall()
+    def fetch_users(self, after_id=0, limit=None, login_prefix=None, role=None):
+        """(id, login, role) по возрастанию id. Постранично: следующая страница
+        запрашивается с after_id = id последней строки предыдущей (keyset, без OFFSET)."""
+        query = "SELECT id, login, role FROM users WHERE id > ?"
+        params = [after_id]
+        if login_prefix:
+            # Диапазон вместо LIKE: так SQLite использует индекс по login
+            query += " AND login >= ? AND login < ?"
+            params += [login_prefix, login_prefix + "\U0010ffff"]
+        if role:
+            query += " AND role = ?"
+            params.append(role)
+        query += " ORDER BY id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        users = self._connection().execute(query, params).fetchall()
         return users
 
+    def fetch_user(self, user_id):
+        return self._fetchone("SELECT id, login, role FROM users WHERE id = ?", (user_id,))
+
     def delete_user(self, user_id):
-        self._cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
-        self._conn.commit()
+        self._write(('DELETE FROM refresh_tokens WHERE user_id = ?', (user_id,)),
+                    ('DELETE FROM users WHERE id = ?', (user_id,)))
+        self._forget(user_id=user_id)
 
     def delete_user_by_login(self, login):
-        self._cursor.execute("DELETE FROM users WHERE login = ?", (login,))
-        self._conn.commit()
+        self._write(("DELETE FROM refresh_tokens WHERE user_id IN (SELECT id FROM users WHERE login = ?)", (login,)),
+                    ("DELETE FROM users WHERE login = ?", (login,)))
+        self._forget(login)
+
+    def add_refresh_token(self, jti, user_id, expires_at):
+        # Заодно убираем истёкшие токены, чтобы таблица не росла бесконечно
+        self._write(("DELETE FROM refresh_tokens WHERE expires_at < strftime('%s', 'now')", ()),
+                    ("INSERT INTO refresh_tokens (jti, user_id, expires_at) VALUES (?, ?, ?)",
+                     (jti, user_id, expires_at)))
+
+    def use_refresh_token(self, jti, user_id):
+        # Отзывает токен и возвращает True, если он был действующим: каждый refresh-токен одноразовый
+        cursor = self._write(("UPDATE refresh_tokens SET revoked = 1 WHERE jti = ? AND user_id = ? AND revoked = 0 "
+                              "AND user_id IN (SELECT id FROM users)", (jti, user_id)))
+        return cursor.rowcount == 1
+
+    def revoke_refresh_token(self, jti):
+        self._write(("UPDATE refresh_tokens SET revoked = 1 WHERE jti = ?", (jti,)))
+
+    def revoke_user_tokens(self, user_id):
+        self._write(("UPDATE refresh_tokens SET revoked = 1 WHERE user_id = ?", (user_id,)))
+
+    IMPORT_BATCH_SIZE = 1000
+    ROLES = ("user", "admin")
+
+    def import_users(self, rows, on_conflict="skip", workers=None):
+        """Массовое добавление пользователей. rows - словари с login и role (необязательно)
+        и либо password, либо готовым bcrypt-хешем password_hash. Пароли хешируются
+        параллельно в workers процессах, затем все строки пишутся одной короткой
+        транзакцией через executemany. on_conflict: skip - оставить существующих,
+        update - заменить пароль и роль. Возвращает число добавленных или изменённых записей."""
+        if on_conflict == "skip":
+            query = "INSERT OR IGNORE INTO users (login, password, role) VALUES (?, ?, ?)"
+        elif on_conflict == "update":
+            query = ("INSERT INTO users (login, password, role) VALUES (?, ?, ?) "
+                     "ON CONFLICT(login) DO UPDATE SET password = excluded.password, role = excluded.role")
+        else:
+            raise ValueError("on_conflict must be skip or update")
+        rows = [self._import_row(row) for row in rows]
+        if on_conflict == "skip":
+            # Существующих пользователей всё равно пропустим - не тратим на них bcrypt
+            existing = self._existing_logins([row[0] for row in rows])
+            rows = [row for row in rows if row[0] not in existing]
+        # Хешируем до начала транзакции, чтобы не держать блокировку записи минутами
+        plain = [row for row in rows if row[1] is None]
+        if plain:
+            with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                     mp_context=multiprocessing.get_context("spawn")) as executor:
+                hashes = executor.map(hash_password, [row[3] for row in plain], chunksize=16)
+                for row, hashed in zip(plain, hashes):
+                    row[1] = hashed
+        conn = self._connection()
+        changes = conn.total_changes
+        with conn:
+            for start in range(0, len(rows), self.IMPORT_BATCH_SIZE):
+                conn.executemany(query, [row[:3] for row in rows[start:start + self.IMPORT_BATCH_SIZE]])
+        self._forget_all()
+        return conn.total_changes - changes
+
+    def _existing_logins(self, logins):
+        conn = self._connection()
+        existing = set()
+        # Не больше 999 параметров в одном запросе (ограничение старых SQLite)
+        for start in range(0, len(logins), 900):
+            chunk = logins[start:start + 900]
+            placeholders = ",".join("?" * len(chunk))
+            existing.update(login for login, in conn.execute(
+                f"SELECT login FROM users WHERE login IN ({placeholders})", chunk))
+        return existing
+
+    def _import_row(self, row):
+        login = row.get("login")
+        role = row.get("role") or "user"
+        password_hash = row.get("password_hash")
+        if not login:
+            raise ValueError(f"login is required: {row}")
+        if role not in self.ROLES:
+            raise ValueError(f"Unknown role {role!r} for {login}")
+        if password_hash:
+            if isinstance(password_hash, str):
+                password_hash = password_hash.encode()
+            if not password_hash.startswith(b"$2"):
+                raise ValueError(f"password_hash of {login} is not a bcrypt hash")
+            return [login, password_hash, role, None]
+        if not row.get("password"):
+            raise ValueError(f"password or password_hash is required for {login}")
+        return [login, None, role, row["password"]]
+
+    def export_users(self, include_hashes=False):
+        """Пользователи по одному словарю, в порядке id, без загрузки всей таблицы в память."""
+        cursor = self._connection().execute("SELECT id, login, role, password FROM users ORDER BY id")
+        for user_id, login, role, password in cursor:
+            user = {"id": user_id, "login": login, "role": role}
+            if include_hashes:
+                user["password_hash"] = password.decode() if isinstance(password, bytes) else password
+            yield user
+
+    def _forget_all(self):
+        with self._users_lock:
+            self._users_version += 1
+            self._users.clear()
+            self._logins_by_id.clear()
 
     def get_user_id_by_login(self, login):
-        self._cursor.execute("SELECT id FROM users WHERE login = ?", (login,))
-        result = self._cursor.fetchone()
+        result = self._user_record(login)
         return result[0] if result else None  # Возвращает ID или None, если пользователь не найден
 
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+
     def __del__(self):
         print("Closing DB")
-        self._cursor.close()
-        self._conn.close()
+        self.close()
 
 # # Пример использования
 # db = ServerDB(".", "dbTest")
 # a = db.check_user("admin", "admin")  # Используйте правильный пароль
 # print(a)  # Ожидается True
-# print(db.get_user("admin"))
\ No newline at end of file
+# print(db.get_user("admin"))
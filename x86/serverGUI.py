@@ -1,18 +1,15 @@
 import json
 import os
-import re
-import socket
 import tkinter as tk
-from json import JSONDecodeError
 from tkinter import messagebox, ttk
 import threading
 import datetime
-from urllib.parse import unquote
 
-from serverDB import ServerDB
-from jwtManager import JWTManager
+from server import Server
+
+class ServerGui(Server):
+    LOG_NAME_FORMAT = "%Y-%m-%d"
 
-class ServerGui:
     def __init__(self, config_file_path):
         self._root = tk.Tk()
         self._root.geometry("800x600")
@@ -48,22 +45,7 @@ class ServerGui:
             self._root.destroy()
             return
 
-        config_file = self._read_config()
-        self._host = config_file['host']
-        self._port = config_file['port_sender']
-        self._html_directory = os.path.abspath(config_file['html_directory'])
-        self._res_directory = os.path.abspath(config_file['res_directory'])
-        self._max_size_gigabytes = config_file['max_size_gigabytes']
-        self._version = config_file['version']
-        self._log_directory = os.path.abspath(config_file['log_directory'])
-        self._database_directory = os.path.abspath(config_file['database_directory'])
-        self._database_name = config_file['database_name']
-        self._secrets_file = self._read_secret(config_file["secret_path"])
-        self._secret = self._secrets_file['secret']
-        self.MAX_REQUEST_SIZE = 1024 * 1024 * 1024 * self._max_size_gigabytes
-        self.MAX_FILE_SIZE = 1024 * 1024 * 1024 * self._max_size_gigabytes
-
-        self._db = ServerDB(self._database_directory, self._database_name)
+        super().__init__(config_file_path)
 
         self._root.title(f"Server Manager v{self._version}")
 
@@ -72,11 +54,27 @@ class ServerGui:
         threading.Thread(target=self.start_server, daemon=True).start()
         self._root.mainloop()
 
+    # Пользователи подгружаются страницами по мере прокрутки таблицы
+    USERS_PAGE_SIZE = 200
+
     def _show_users(self):
         self._user_tree_window = tk.Toplevel(self._root)
         self._user_tree_window.title("User Role Manager")
         self._user_tree_window.geometry("900x600")
 
+        filter_frame = tk.Frame(self._user_tree_window)
+        filter_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+        tk.Label(filter_frame, text="Login starts with:").pack(side=tk.LEFT)
+        self._login_filter_var = tk.StringVar()
+        login_entry = tk.Entry(filter_frame, textvariable=self._login_filter_var)
+        login_entry.pack(side=tk.LEFT, padx=5)
+        login_entry.bind("<Return>", lambda event: self._load_users())
+        tk.Label(filter_frame, text="Role:").pack(side=tk.LEFT)
+        self._role_filter_var = tk.StringVar(value="all")
+        ttk.Combobox(filter_frame, textvariable=self._role_filter_var, values=["all", "user", "admin"],
+                     state="readonly", width=8).pack(side=tk.LEFT, padx=5)
+        tk.Button(filter_frame, text="Filter", command=self._load_users).pack(side=tk.LEFT)
+
         frame = tk.Frame(self._user_tree_window)
         frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
@@ -86,9 +84,9 @@ class ServerGui:
             self._tree.heading(col, text=col)
         self._tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=self._tree.yview)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self._tree.configure(yscroll=scrollbar.set)
+        self._users_scrollbar = ttk.Scrollbar(frame, orient="vertical", command=self._tree.yview)
+        self._users_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self._tree.configure(yscroll=self._on_users_scroll)
 
         self._role_var = tk.StringVar(value="user")
         role_options = ttk.Combobox(self._user_tree_window, textvariable=self._role_var,
@@ -101,15 +99,36 @@ class ServerGui:
         self._load_users()
 
     def _load_users(self):
-        for row in self._tree.get_children():
-            self._tree.delete(row)
-        for user in self._db.fetch_users():
-            self._tree.insert("", "end", values=user)
+        """Сбрасывает таблицу и загружает первую страницу с текущими фильтрами."""
+        self._tree.delete(*self._tree.get_children())
+        self._users_after_id = 0
+        self._users_exhausted = False
+        self._load_users_page()
+
+    def _load_users_page(self):
+        if self._users_exhausted:
+            return
+        role = self._role_filter_var.get()
+        users = self._db.fetch_users(self._users_after_id, self.USERS_PAGE_SIZE,
+                                     login_prefix=self._login_filter_var.get() or None,
+                                     role=None if role == "all" else role)
+        for user in users:
+            # iid - id пользователя, чтобы строку можно было обновить на месте
+            self._tree.insert("", "end", iid=str(user[0]), values=user)
+        if users:
+            self._users_after_id = users[-1][0]
+        self._users_exhausted = len(users) < self.USERS_PAGE_SIZE
+
+    def _on_users_scroll(self, first, last):
+        self._users_scrollbar.set(first, last)
+        # Близко к концу загруженного - догружаем следующую страницу
+        if float(last) > 0.9:
+            self._load_users_page()
 
     def _change_role(self):
         selected_item = self._tree.selection()
         if selected_item:
-            user_id = self._tree.item(selected_item, "values")[0]
+            user_id = int(self._tree.item(selected_item, "values")[0])
             new_role = self._role_var.get()
             self._update_role(user_id, new_role)
             messagebox.showinfo("Success", "Role updated successfully!")
@@ -118,7 +137,10 @@ class ServerGui:
 
     def _update_role(self,user_id, new_role):
         self._db.update_role(user_id, new_role)
-        self._load_users()
+        # Обновляем только изменённую строку, а не перечитываем всю таблицу
+        user = self._db.fetch_user(user_id)
+        if user:
+            self._tree.item(str(user[0]), values=user)
 
     def _display_text(self, text):
         """Метод для добавления текста в текстовое поле."""
@@ -137,12 +159,6 @@ class ServerGui:
         # Use a different format for the filename to avoid invalid characters
         return datetime.datetime.now().strftime("%Y-%m-%d %H-%M-%S") + end
 
-    def _log(self, content):
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
-        filename = os.path.join(self._log_directory, f"{today}.txt")
-        with open(filename, "a") as f:
-            f.write(content + '\n')
-
     def _check_folders(self, res_path, html_path, log_directory, database_directory):
         for path in [res_path, html_path, log_directory, database_directory]:
             self._display_text(f'Checking {path}')
@@ -153,10 +169,6 @@ class ServerGui:
             self._display_text("OK")
         self._display_text(self._get_datetime())
 
-    def _read_config(self):
-        with open(self._config_file_path, 'r') as config_file:
-            return json.load(config_file)
-
     def _read_secret(self, file_path):
         try:
             with open(file_path, 'r') as secret_file:
@@ -164,34 +176,6 @@ class ServerGui:
         except FileNotFoundError:
             messagebox.showerror("Error", f"Config file not found\nMake sure {file_path} exists")
 
-    def _print_tree(self, path, prefix=""):
-        buffer = []
-        try:
-            items = os.listdir(path)
-        except Exception as e:
-            buffer.append(f"Error accessing directory {path}: {e}")
-            return buffer
-
-        items.sort()
-
-        for index, item in enumerate(items):
-            item_path = os.path.join(path, item)
-            is_last = index == len(items) - 1
-
-            connector = "|__ " if is_last else "|-- "
-            try:
-                item_encoded = item.encode('utf-8').decode('utf-8')
-            except UnicodeDecodeError:
-                item_encoded = item.encode('utf-8', 'replace').decode('utf-8')
-
-            buffer.append(prefix + connector + item_encoded)
-
-            if os.path.isdir(item_path):
-                new_prefix = prefix + ("    " if is_last else "|   ")
-                buffer.extend(self._print_tree(item_path, new_prefix))
-
-        return buffer
-
     def _show_tree(self):
         """Показать дерево директорий в новом окне."""
         tree_window = tk.Toplevel(self._root)
@@ -201,456 +185,13 @@ class ServerGui:
         tree_text_area = tk.Text(tree_window, wrap="word")
         tree_text_area.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
 
-        tree_output = self._print_tree(self._res_directory)
+        tree_output = self._storage_index.tree_lines()
         formatted_tree = "\n".join(tree_output)
 
         tree_text_area.insert(tk.END, formatted_tree)
         tree_text_area.configure(state=tk.NORMAL)  # Делаем текст редактируемым для возможности копирования
         tree_text_area.configure(state=tk.DISABLED)  # Возвращаем в нередактируемый режим
 
-    def _create_directory_structure(self, path):
-        structure = {}
-        try:
-            items = os.listdir(path)
-        except Exception as e:
-            return {"error": str(e)}
-        for item in items:
-            item_path = os.path.join(path, item)
-            if os.path.isdir(item_path):
-                structure[item] = {
-                    "type": "directory",
-                    "children": self._create_directory_structure(item_path)
-                }
-            else:
-                structure[item] = {
-                    "type": "file"
-                }
-        return structure
-
-    def _read_full_request(self, conn, body = True):
-        data = b''
-        while True:
-            chunk = conn.recv(4096)
-            if not chunk:
-                break
-            data += chunk
-
-            # Декодируем только после завершения чтения
-            try:
-                decoded_data = data.decode('utf-8')
-            except UnicodeDecodeError:
-                print("Ошибка декодирования. Проверьте кодировку.")
-                # Можно обработать ошибку или вернуть None
-                return None
-
-            if len(decoded_data) > self.MAX_REQUEST_SIZE:
-                raise ValueError("Request size exceeds limit")
-            if '\r\n\r\n' in decoded_data:
-                headers_part, body_part = decoded_data.split('\r\n\r\n', 1)
-                headers = headers_part.split('\r\n')
-                content_length = 0
-
-                for header in headers:
-                    if header.lower().startswith('content-length:'):
-                        content_length = int(header.split(': ')[1])
-                        break
-
-                if content_length > self.MAX_REQUEST_SIZE:
-                    raise ValueError("Request body too large")
-
-                while len(body_part) < content_length:
-                    chunk = conn.recv(4096)
-                    if not chunk:
-                        break
-                    body_part += chunk.decode('utf-8', errors='ignore')  # Декодируем только тело
-                    print(headers_part + '\r\n\r\n' + body_part)
-                if body:
-                    return headers_part + '\r\n\r\n' + body_part
-                else:
-                    return headers_part + '\r\n\r\n'
-
-    def _remove_auth_line(self, text):
-        masked_data = re.sub(r'("password":\s*")[^"]*(")', r'\1****\2', text)
-        masked_data = re.sub(r'("token":\s*")[^"]*(")', r'\1****\2', masked_data)
-        return masked_data
-
-    def _handle_client(self, conn):
-        try:
-            conn.settimeout(45)
-            request = self._read_full_request(conn)
-            request_head = self._remove_auth_line(request)
-
-            print(request_head)
-            self._display_text(request_head)
-            self._log(f"{request_head}")
-
-            print(datetime.datetime.now().strftime("%d.%m.%Y %H:%M:%S"))
-            self._display_text(datetime.datetime.now().strftime("%d.%m.%Y %H:%M:%S"))
-            print("\n"
-                  ".....................................................")
-            print("")
-            self._log(f"..............................................")
-            self._display_text(f"..............................................")
-
-
-            if not request:
-                return
-
-            if request.startswith('GET'):
-                self._handle_get(conn, request)
-            elif request.startswith('POST'):
-                self._handle_post(conn, request)
-            else:
-                self._send_response(conn, "Method Not Allowed", 405)
-        except ValueError as e:
-            self._send_response(conn, str(e), 413)
-        except Exception as e:
-            self._send_response(conn, f"Internal Server Error: {e}", 500)
-        finally:
-            conn.close()
-
-    def _handle_post(self, conn, request):
-        status_code = 200
-        content_type = 'text/plain'
-        response_body = "Unknown command."
-
-        try:
-            post_data = {}
-            command = ""
-            # Разделяем заголовки и тело запроса
-            if '\r\n\r\n' not in request:
-                raise ValueError("Invalid request format: missing headers-body separator.")
-
-            headers, body = request.split('\r\n\r\n', 1)
-
-            # Извлекаем Content-Length (если есть)
-            content_length = 0
-            for header_line in headers.split('\r\n'):
-                if header_line.startswith("Content-Length:"):
-                    content_length = int(header_line.split(': ')[1])
-                    break
-
-            # Проверяем, что тело запроса не пустое
-            if not body and content_length > 0:
-                raise ValueError("Empty body in request.")
-
-            # Извлекаем Content-Type (если есть)
-            content_type = 'text/plain'  # Значение по умолчанию
-            for header_line in headers.split('\r\n'):
-                if header_line.startswith("Content-Type:"):
-                    content_type = header_line.split(': ')[1]
-                    break
-
-            # Обрабатываем multipart/form-data
-            if 'multipart/form-data' in content_type:
-                boundary = content_type.split('boundary=')[1]
-                parts = body.split('--' + boundary)
-
-                for part in parts:
-                    if 'filename="' in part:
-                        file_name = part.split('filename="')[1].split('"')[0]
-                        file_content = part.split('\r\n\r\n')[1].rstrip('\r\n--')
-                        file_path = os.path.join(self._res_directory, file_name)
-
-                        with open(file_path, 'wb') as f:
-                            f.write(file_content.encode())
-
-                        response_body = f"File '{file_name}' uploaded successfully."
-                        break
-            # Обрабатываем application/json
-            elif 'application/json' in content_type:
-                if not body:
-                    raise ValueError("Empty JSON body.")
-
-                try:
-                    post_data = json.loads(body)  # Декодируем JSON из тела запроса
-                    command = post_data.get("command")  # Извлекаем команду
-                except json.JSONDecodeError as e:
-                    raise ValueError(f"Invalid JSON: {str(e)}")
-
-            # Обрабатываем обычные form-data
-            else:
-                for pair in body.split('&'):
-                    if '=' in pair:
-                        key, value = pair.split('=', 1)
-                        post_data[key] = unquote(value)
-                try:
-
-                    command = post_data.get("command")  # Извлекаем команду
-                except json.JSONDecodeError as e:
-                    raise ValueError(f"Invalid JSON: {str(e)}")
-
-
-
-            # Дополнительная логика для обработки команд
-            if "upload" in headers:
-                file_name = headers.split('filename="')[1].split('"')[0]
-                file_path = os.path.join(self._res_directory, file_name)
-
-                with open(file_path, 'wb') as f:
-                    f.write(body.encode()[:content_length])
-
-            content_type = 'text/plain'
-            if command == "status":
-                response_body = "Server is running."
-            elif command == "list":
-                token = JWTManager(self._secret)
-                user_token = post_data.get("token")
-                if token.validate_token(user_token):
-                    structure = self._create_directory_structure(self._res_directory)
-                    response_body = json.dumps(structure, indent=2)
-                    content_type = 'application/json'
-                else:
-                    response_body = {"status": "error", "message": "Invalid token"}
-                    response_body = json.dumps(response_body, indent=2)
-                    self._send_response(conn, response_body)
-            elif command == "tree":
-                tree_lines = self._print_tree(self._res_directory)
-                response_body = "\n".join(tree_lines)
-            elif command == "version":
-                response_body = f"Current version is {self._version}"
-            elif command == "versionNum":
-                response_body = f"{self._version}"
-            elif command == "auth":
-                login = post_data.get("login")
-                password = post_data.get("password")
-                response_body = {}
-                if not login:
-                    response_body = {"status": "Login is required."}
-                    response_body = json.dumps(response_body)
-                elif not password:
-                    response_body = {"status": "Password is required."}
-                    response_body = json.dumps(response_body)
-
-
-                check_result = self._db.check_user(login, password)
-                if check_result:
-                    token = JWTManager(self._secret)
-                    user_id = self._db.get_user_id_by_login(login)
-                    encode_token = token.encode(user_id)
-
-                    response_body = {
-                        "status": "success",
-                        f"token": f"{encode_token}"
-                    }
-                    response_body = json.dumps(response_body)
-                else:
-                    response_body = {
-                        "status": "auth error"
-                    }
-                    response_body = json.dumps(response_body)
-            elif command == "reg":
-                login = post_data.get("login")
-                password = post_data.get("password")
-                if not login:
-                    response_body = {"status": "Login is required."}
-                elif not password:
-                    response_body = {"status": "Password is required."}
-                else:
-                    content_type = "application/json"
-                    self._db.insert_user(login, password)
-                    message1 = f"User {login} registered successfully."
-                    message2 = f"Add {login} to db successfully."
-                    time = datetime.datetime.now().strftime("%d-%m-%Y %H:%M:%S")
-                    self._display_text(message1)
-                    self._display_text(message2)
-                    self._display_text(time)
-                    self._log(f"{message1}\n{message2}\n{time}")
-                    if self._db.check_user(login, password):
-                        response_body = {"status":"success"}
-                    response_body = json.dumps(response_body)
-            else:
-                response_body = {"status": "unsupported"}
-                response_body = json.dumps(response_body)
-                status_code = 400
-        except JSONDecodeError as e:
-            response_body = {"status": "error", "message": str(e)}
-            response_body = json.dumps(response_body)
-            status_code = 400
-        except ValueError as e:
-            response_body = {"status": "error", "message": str(e)}
-            response_body = json.dumps(response_body)
-            status_code = 400
-        except Exception as e:
-            response_body = {"status": "error", "message": str(e)}
-            response_body = json.dumps(response_body)
-            status_code = 500
-
-        self._send_response(conn, response_body, status_code, content_type)
-
-    def _handle_get(self, conn, request):
-        try:
-            request_line = request.split('\r\n')[0]
-            method, path, protocol = request_line.split()
-            path = path.lstrip('/')
-            path = unquote(path)
-
-            if path == "":
-                full_path = os.path.join(self._html_directory, "index.html")
-            elif path == "menu":
-                full_path = os.path.join(self._html_directory, "menu.html")
-            elif path == "main":
-                full_path = os.path.join(self._html_directory, "main.html")
-            elif path == "reg":
-                full_path = os.path.join(self._html_directory, "registration.html")
-            elif path == "auth":
-                full_path = os.path.join(self._html_directory, "index.html")
-            elif path.endswith('.html'):
-                full_path = os.path.join(self._html_directory, path)
-            elif path=='icon.png':
-                full_path = os.path.join(self._html_directory, path)
-            else:
-                full_path = os.path.join(self._res_directory, path)
-
-            if os.path.isfile(full_path):
-                if full_path.endswith('.html'):
-                    self._serve_html_file(conn, full_path)
-                else:
-                    self._serve_file(conn, full_path)
-            else:
-                self._serve_404(conn)
-        except Exception as e:
-            self._send_response(conn, "Bad Request", 400)
-
-    def _serve_file(self, conn, file_path):
-        try:
-            if not os.path.isfile(file_path):
-                self._send_response(conn, "Not Found", 404)
-                return
-            file_size = os.path.getsize(file_path)
-            # Проверка на превышение максимального размера
-            if file_size > self.MAX_FILE_SIZE:
-                try:
-                    self._serve_413(conn)
-                except Exception as e:
-                    self._send_response(conn, "File size exceeds limit", 413)
-                    self._display_text(e)
-                return
-
-            file_name = os.path.basename(file_path)
-            file_size = os.path.getsize(file_path)
-
-            headers = [
-                "HTTP/1.1 200 OK",
-                "Content-Type: application/octet-stream",
-                f"Content-Length: {file_size}",
-                f"Content-Disposition: attachment; filename=\"{file_name}\"",
-                "\r\n"
-            ]
-
-            conn.sendall("\r\n".join(headers).encode())
-
-            with open(file_path, 'rb') as f:
-                while chunk := f.read(4096):
-                    try:
-                        conn.sendall(chunk)
-                    except (ConnectionResetError, BrokenPipeError):
-                        self._display_text(f"Connection lost while sending file: {file_path}")
-                        break
-                    except Exception as e:
-                        self._display_text(e)
-                        return
-        except Exception as e:
-            print(f"Error serving file {file_path}: {e}")
-            self._send_response(conn, "Internal Server Error", 500)
-
-    def _serve_html_file(self, conn, file_path):
-
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            self._send_response(conn, content, content_type='text/html')
-        except FileNotFoundError:
-            self._serve_404(conn)
-
-    def _send_response(self, conn, content, status_code=200, content_type='text/plain'):
-        headers = {
-            "Content-Type": content_type,
-            "Connection": "close"
-        }
-
-        response = [
-            f"HTTP/1.1 {status_code} {self._get_status_text(status_code)}",
-            f"Content-Length: {len(content)}",
-            *[f"{k}: {v}" for k, v in headers.items()],
-            "\r\n"
-        ]
-
-        header_data = "\r\n".join(response)
-        conn.sendall(header_data.encode() + content.encode())
-
-    def _send_response_headers(self, conn, status_code, headers):
-        response = [
-            f"HTTP/1.1 {status_code} {self._get_status_text(status_code)}",
-            *[f"{k}: {v}" for k, v in headers.items()],
-            "\r\n"
-        ]
-        header_data = "\r\n".join(response)
-        conn.sendall(header_data.encode())
-
-    def _get_status_text(self, status_code):
-        return {
-            200: 'OK',
-            400: 'Bad Request',
-            403: 'Forbidden',
-            404: 'Not Found',
-            405: 'Method Not Allowed',
-            413: 'Payload Too Large',
-            500: 'Internal Server Error'
-        }.get(status_code, 'Unknown Status')
-
-    def _serve_404(self, conn):
-        error_path = os.path.join(self._html_directory, '404.html')
-        if os.path.exists(error_path):
-            with open(error_path, 'r') as f:
-                content = f.read()
-            self._send_response(conn, content, 404, "text/html")
-        else:
-            self._send_response(conn, "Not Found", 404)
-
-    def _serve_413(self, conn):
-        error_path = os.path.join(self._html_directory, '413.html')
-        if os.path.exists(error_path):
-            with open(error_path, 'r') as f:
-                content = f.read()
-            self._send_response(conn, content, 404, "text/html")
-        else:
-            self._send_response(conn, "Payload Too Large", 404)
-
     def start_server(self):
-        self._check_folders(self._res_directory, self._html_directory, self._log_directory, self._database_directory)
-        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        server.bind((self._host, self._port))
-        server.listen(50)
-        line = f'| Server running on http://{self._host}:{self._port} { datetime.datetime.now().strftime("%d.%m.%Y %H:%M:%S")} |'
-        self._log(line)
-        print(line)
-
-        self._display_text("+" * len(line))
-        self._display_text(line)
-        self._display_text("+" * len(line))
-        flag = True
-        try:
-            while flag:
-                conn, addr = server.accept()
-                line = f"Connected to IP: {addr[0]}\nPORT: {addr[1]}\nDATE: " + datetime.datetime.now().strftime("%d.%m.%Y %H:%M:%S")+"\n"
-                self._display_text("-" * len(line))
-                self._log("-" * len(line))
-                self._log(line)
-                self._display_text(line)
-                client_thread = threading.Thread(target=self._handle_client, args=(conn,))
-                client_thread.start()
-        except KeyboardInterrupt:
-            print("Остановка сервера...")
-        finally:
-            server.close()
-            print(f"Сервер остановлен.\n{datetime.datetime.now().strftime('%d.%m.%Y %H:%M:%S')}")
-            self._log(f"Сервер остановлен.\n{datetime.datetime.now().strftime('%d.%m.%Y %H:%M:%S')}")
-
-    def __del__(self):
-        print("+++++++++++++++++++++++++++++")
-        print("| The server is shutting up |")
-        print("+++++++++++++++++++++++++++++")
-
-
-
+        """Сетевая часть целиком общая с консольным Server."""
+        super().start()
@@ -1,10 +1,9 @@
 from check_architecrure import check_system_bitness as check
 from serverGUI import ServerGui
-from server import Server
-
-passw = str(input("Enter mode(enter to gui, cli to console>> "))
+from supervisor import Supervisor
 
 if __name__ == "__main__":
+    passw = str(input("Enter mode(enter to gui, cli to console>> "))
     bitness = check()
     config_path = "config/config.json"
     print(bitness)
@@ -12,5 +11,6 @@ if __name__ == "__main__":
         app = ServerGui(config_path)
         app.start()
     else:
-        server = Server(config_path)
-        server.start()
\ No newline at end of file
+        # workers из конфига: 1 - обычный Server в этом процессе
+        server = Supervisor(config_path)
+        server.start()
@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from contentEncoding import compress, gzip_sibling, write_gzip_sibling
+
+
+def encode_headers(headers):
+    return "".join(f"{k}: {v}\r\n" for k, v in headers.items()).encode()
+
+
+class CachedFile:
+    def __init__(self, path, body, stat, headers):
+        self.path = path
+        self.body = body
+        self.stat = stat
+        self.headers = headers
+        # Готовые строки заголовков "Name: value\r\n" в байтах, без Connection
+        self.head = encode_headers(headers)
+        # Сжатые варианты: encoding -> (head, body) или None, если сжатие не выгодно
+        self.variants = {}
+        self.checked_at = time.monotonic()
+
+
+class StaticCache:
+    """Файлы html_directory в памяти вместе с заранее закодированными заголовками.
+    Актуальность проверяется по stat не чаще раза в check_interval секунд;
+    при превышении max_bytes вытесняются давно не запрошенные файлы (LRU)."""
+
+    def __init__(self, directory, headers_factory, max_bytes=16 * 1024 * 1024, check_interval=1.0):
+        # headers_factory(path, stat, size) -> dict заголовков для ответа 200
+        self._directory = directory
+        self._headers_factory = headers_factory
+        self._max_bytes = max_bytes
+        self._max_file_size = max_bytes // 4
+        self._check_interval = check_interval
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def preload(self):
+        try:
+            entries = list(os.scandir(self._directory))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.is_file() and not entry.name.endswith('.gz'):
+                self.get(entry.path)
+
+    def get(self, path):
+        """Возвращает CachedFile или None, если файла нет или он слишком велик для кеша."""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None:
+                self._entries.move_to_end(path)
+                if now - cached.checked_at < self._check_interval:
+                    return cached
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._discard(path)
+            return None
+        if cached is not None and self._same_file(cached.stat, stat):
+            cached.checked_at = now
+            return cached
+        if stat.st_size > self._max_file_size:
+            self._discard(path)
+            return None
+        return self._load(path)
+
+    def _load(self, path):
+        try:
+            with open(path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                body = f.read()
+        except OSError:
+            self._discard(path)
+            return None
+        cached = CachedFile(path, body, stat, self._headers_factory(path, stat, len(body)))
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._size -= self._entry_size(old)
+            self._entries[path] = cached
+            self._size += len(body)
+            self._evict()
+        return cached
+
+    def variant(self, cached, encoding):
+        """Сжатый вариант файла: (head, body) или None, если сжатие не уменьшает размер.
+        gzip берётся из свежего .gz рядом с файлом или создаётся при первом запросе."""
+        if encoding in cached.variants:
+            return cached.variants[encoding]
+        data = None
+        if encoding == "gzip":
+            sibling = gzip_sibling(cached.path, cached.stat)
+            if sibling:
+                with open(sibling, 'rb') as f:
+                    data = f.read()
+        if data is None:
+            data = compress(cached.body, encoding)
+            if encoding == "gzip":
+                write_gzip_sibling(cached.path, data)
+        result = None
+        if len(data) < len(cached.body):
+            etag = cached.headers["ETag"]
+            headers = {
+                **cached.headers,
+                "Content-Encoding": encoding,
+                "Content-Length": len(data),
+                # Сжатый вариант не совпадает побайтно, поэтому его ETag только слабый
+                "ETag": etag if etag.startswith("W/") else f"W/{etag}"
+            }
+            result = (encode_headers(headers), data)
+        with self._lock:
+            if encoding not in cached.variants:
+                cached.variants[encoding] = result
+                if result and self._entries.get(cached.path) is cached:
+                    self._size += len(data)
+                    self._evict()
+        return cached.variants[encoding]
+
+    def _evict(self):
+        while self._size > self._max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= self._entry_size(evicted)
+
+    @staticmethod
+    def _entry_size(cached):
+        return len(cached.body) + sum(len(v[1]) for v in cached.variants.values() if v)
+
+    def _discard(self, path):
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._size -= self._entry_size(old)
+
+    @staticmethod
+    def _same_file(old, new):
+        return (old.st_ino, old.st_size, old.st_mtime_ns) == (new.st_ino, new.st_size, new.st_mtime_ns)
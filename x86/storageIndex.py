@@ -0,0 +1,284 @@
+import bisect
+import hashlib
+import json
+import os
+import threading
+
+
+class IndexNode:
+    __slots__ = ('name', 'is_dir', 'children', 'mtime_ns', 'size', 'digest', '_sorted')
+
+    def __init__(self, name, is_dir, stat=None):
+        self.name = name
+        self.is_dir = is_dir
+        # name -> IndexNode; словарь не меняется на месте, а заменяется целиком,
+        # поэтому читатели обходят дерево без блокировки
+        self.children = {} if is_dir else None
+        # У каталога mtime_ns выставляет _refresh при чтении, у файла - stat из scandir
+        self.mtime_ns = stat.st_mtime_ns if stat else None
+        self.size = stat.st_size if stat else None
+        # (size, mtime_ns, sha256) - хеш считается по запросу и действителен, пока файл не менялся
+        self.digest = None
+        self._sorted = None
+
+    def sorted_children(self):
+        return self._sorted_view()[2]
+
+    def sorted_names(self):
+        return self._sorted_view()[1]
+
+    def _sorted_view(self):
+        children = self.children
+        cached = self._sorted
+        if cached is None or cached[0] is not children:
+            names = sorted(children)
+            cached = (children, names, [children[name] for name in names])
+            self._sorted = cached
+        return cached
+
+
+class StorageIndex:
+    """Дерево res_directory в памяти. Строится один раз через os.scandir, затем
+    фоновый поток раз в rescan_interval секунд сверяет mtime каталогов и
+    перечитывает только изменившиеся. Загрузки сервера добавляются сразу через add_file."""
+
+    # Временные файлы незавершённых загрузок в индекс не попадают
+    HIDDEN_PREFIXES = (".upload-", ".gz-")
+
+    # Дополнительные поля записей list
+    FIELDS = ("size", "mtime", "hash")
+
+    def __init__(self, root, rescan_interval=5.0):
+        self._root_path = root
+        self._rescan_interval = rescan_interval
+        self._root = IndexNode("", True)
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._listeners = []
+
+    def subscribe(self, callback):
+        """callback(rel_path) вызывается под блокировкой записи: с путём нового файла
+        после add_file или с None, если пересканирование изменило дерево."""
+        self._listeners.append(callback)
+
+    def _notify(self, rel_path):
+        for callback in self._listeners:
+            callback(rel_path)
+
+    def build(self):
+        with self._write_lock:
+            self._refresh(self._root, self._root_path)
+            self._notify(None)
+
+    def start(self):
+        threading.Thread(target=self._rescan_loop, name="storage-index", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def add_file(self, rel_path):
+        """Сразу вносит в индекс файл, записанный самим сервером."""
+        parts = self._split(rel_path)
+        if not parts:
+            return
+        try:
+            stat = os.stat(os.path.join(self._root_path, *parts))
+        except OSError:
+            return
+        with self._write_lock:
+            node = self._root
+            for name in parts[:-1]:
+                child = node.children.get(name)
+                if child is None or not child.is_dir:
+                    child = IndexNode(name, True)
+                    node.children = {**node.children, name: child}
+                node = child
+            is_new = parts[-1] not in node.children
+            # Файл мог быть перезаписан - узел заменяем, чтобы обновить размер и mtime
+            node.children = {**node.children, parts[-1]: IndexNode(parts[-1], False, stat)}
+            if is_new:
+                self._notify("/".join(parts))
+
+    def file_paths(self, node=None, prefix=""):
+        """Пути всех файлов относительно корня."""
+        node = node or self._root
+        for name, child in node.children.items():
+            path = f"{prefix}/{name}" if prefix else name
+            if child.is_dir:
+                yield from self.file_paths(child, path)
+            else:
+                yield path
+
+    def structure_json(self, fields=(), node=None, prefix=""):
+        """Вложенная структура для команды list в виде компактных фрагментов JSON.
+        Дерево обходится по мере отправки, целиком в памяти ответ не собирается."""
+        node = node or self._root
+        yield "{"
+        separator = ""
+        for name, child in node.children.items():
+            path = f"{prefix}/{name}" if prefix else name
+            entry = {"type": "directory" if child.is_dir else "file"}
+            if fields:
+                self._describe(entry, child, path, fields)
+            item = json.dumps(entry, separators=(',', ':'))
+            yield f"{separator}{json.dumps(name)}:"
+            separator = ","
+            if child.is_dir:
+                yield item[:-1] + ',"children":'
+                yield from self.structure_json(fields, child, path)
+                yield "}"
+            else:
+                yield item
+        yield "}"
+
+    def find(self, rel_path):
+        """Узел по пути относительно корня или None."""
+        node = self._root
+        for name in self._split(rel_path):
+            if not node.is_dir or name not in node.children:
+                return None
+            node = node.children[name]
+        return node
+
+    def page(self, rel_path, depth, limit, after=None, fields=()):
+        """Страница записей под rel_path в порядке обхода в глубину (по имени),
+        не глубже depth уровней. after - путь последней записи предыдущей
+        страницы. Возвращает (entries, путь последней записи или None, если это конец)."""
+        base = self.find(rel_path)
+        if base is None or not base.is_dir:
+            raise KeyError(rel_path)
+        prefix = "/".join(self._split(rel_path))
+        after_parts = self._split(after)[len(self._split(rel_path)):] if after else []
+        entries = []
+        for entry, node in self._walk(base, prefix, depth, after_parts):
+            if len(entries) == limit:
+                return entries, entries[-1]["path"]
+            if fields:
+                self._describe(entry, node, entry["path"], fields)
+            entries.append(entry)
+        return entries, None
+
+    def _describe(self, entry, node, rel_path, fields):
+        if not node.is_dir:
+            # Перезапись и дозапись файла не меняют mtime каталога, и пересканирование
+            # их не заметит - размер и время файла (и по ним годность хеша) берём свежие
+            self._restat(node, rel_path)
+        if "size" in fields and not node.is_dir:
+            entry["size"] = node.size
+        if "mtime" in fields and node.mtime_ns is not None:
+            entry["mtime"] = node.mtime_ns / 1e9
+        if "hash" in fields and not node.is_dir:
+            entry["sha256"] = self.file_hash(node, rel_path)
+
+    def _restat(self, node, rel_path):
+        try:
+            stat = os.stat(os.path.join(self._root_path, *self._split(rel_path)))
+        except OSError:
+            return
+        node.size, node.mtime_ns = stat.st_size, stat.st_mtime_ns
+
+    def file_hash(self, node, rel_path):
+        """sha256 файла; пересчитывается, только если файл изменился с прошлого раза."""
+        digest = node.digest
+        if digest and digest[:2] == (node.size, node.mtime_ns):
+            return digest[2]
+        try:
+            with open(os.path.join(self._root_path, *self._split(rel_path)), 'rb') as f:
+                stat = os.fstat(f.fileno())
+                sha256 = hashlib.sha256()
+                while chunk := f.read(1024 * 1024):
+                    sha256.update(chunk)
+        except OSError:
+            return None
+        # Содержимое могло поменяться на месте без изменения каталога - обновляем и stat
+        node.size, node.mtime_ns = stat.st_size, stat.st_mtime_ns
+        node.digest = (stat.st_size, stat.st_mtime_ns, sha256.hexdigest())
+        return node.digest[2]
+
+    def _walk(self, node, prefix, depth, after_parts):
+        # after_parts - остаток пути курсора на этом уровне: всё до него уже отдано
+        names = node.sorted_names()
+        children = node.sorted_children()
+        start = bisect.bisect_left(names, after_parts[0]) if after_parts else 0
+        for index in range(start, len(children)):
+            child = children[index]
+            path = f"{prefix}/{child.name}" if prefix else child.name
+            resume = after_parts[1:] if after_parts and index == start and child.name == after_parts[0] else None
+            if resume is None:
+                entry = {"path": path, "name": child.name, "type": "directory" if child.is_dir else "file"}
+                if child.is_dir:
+                    entry["children"] = len(child.children)
+                yield entry, child
+            if child.is_dir and depth > 1:
+                yield from self._walk(child, path, depth - 1, resume or [])
+
+    @staticmethod
+    def _split(rel_path):
+        parts = [part for part in (rel_path or "").replace('\\', '/').split('/') if part]
+        if any(part in (".", "..") for part in parts):
+            raise KeyError(rel_path)
+        return parts
+
+    def tree_lines(self, node=None, prefix=""):
+        """Строки дерева с псевдографикой для команды tree."""
+        node = node or self._root
+        buffer = []
+        items = node.sorted_children()
+        for index, child in enumerate(items):
+            is_last = index == len(items) - 1
+            buffer.append(prefix + ("|__ " if is_last else "|-- ") + child.name)
+            if child.is_dir:
+                buffer.extend(self.tree_lines(child, prefix + ("    " if is_last else "|   ")))
+        return buffer
+
+    def _rescan_loop(self):
+        while not self._stop.wait(self._rescan_interval):
+            try:
+                with self._write_lock:
+                    if self._refresh(self._root, self._root_path):
+                        self._notify(None)
+            except Exception as e:
+                print(f"Storage index rescan failed: {e}")
+
+    def _refresh(self, node, path):
+        """Возвращает True, если в поддереве что-то перечитано."""
+        # mtime каталога меняется при добавлении, удалении и переименовании записей в нём
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return False
+        changed = False
+        if mtime_ns != node.mtime_ns:
+            node.mtime_ns = mtime_ns
+            node.children = self._scan(node, path)
+            changed = True
+        for child in node.children.values():
+            if child.is_dir:
+                changed = self._refresh(child, os.path.join(path, child.name)) or changed
+        return changed
+
+    def _scan(self, node, path):
+        children = {}
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            return children
+        for entry in entries:
+            if entry.name.startswith(self.HIDDEN_PREFIXES):
+                continue
+            try:
+                is_dir = entry.is_dir()
+                # stat берём у самой DirEntry: на Windows он уже получен scandir, отдельных вызовов нет
+                stat = None if is_dir else entry.stat()
+            except OSError:
+                continue
+            old = node.children.get(entry.name)
+            if is_dir:
+                # Уже известные подкаталоги сохраняем - их содержимое проверит _refresh
+                children[entry.name] = old if old is not None and old.is_dir else IndexNode(entry.name, True)
+                continue
+            child = IndexNode(entry.name, False, stat)
+            if old is not None and not old.is_dir:
+                child.digest = old.digest
+            children[entry.name] = child
+        return children
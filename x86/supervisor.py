@@ -0,0 +1,111 @@
+import json
+import multiprocessing
+import os
+import queue
+import socket
+
+from asyncLogger import AsyncLogger
+from server import Server
+from serverDB import ServerDB
+
+
+def _run_worker(config_file_path, log_queue, listener):
+    server = Server(config_file_path, log_queue=log_queue)
+    server.start(listener)
+
+
+class Supervisor:
+    """Запускает workers процессов Server на одном порту, перезапускает упавшие
+    и пишет их логи в общий файл (воркеры присылают строки через очередь)."""
+
+    def __init__(self, config_file_path):
+        self._config_file_path = config_file_path
+        with open(config_file_path, 'r') as config_file:
+            config = json.load(config_file)
+        self._host = config['host']
+        self._port = config['port_sender']
+        self._workers = config.get('workers', 1)
+        self._log_directory = os.path.abspath(config['log_directory'])
+        self._log_settings = dict(max_queue=config.get('log_queue_size', 10000),
+                                  flush_interval=config.get('log_flush_seconds', 1),
+                                  max_bytes=config.get('log_max_mb', 50) * 1024 * 1024,
+                                  overflow=config.get('log_overflow', 'drop'))
+        self._logger = None
+        self._database_directory = os.path.abspath(config['database_directory'])
+        self._database_name = config['database_name']
+        # Очередь строк от воркеров ограничена так же, как очередь AsyncLogger
+        self._log_queue_size = config.get('log_queue_size', 10000)
+        self._log_queue = None
+        self._listener = None
+        self._processes = []
+
+    def start(self):
+        if self._workers <= 1:
+            Server(self._config_file_path).start()
+            return
+
+        for path in (self._log_directory, self._database_directory):
+            os.makedirs(path, exist_ok=True)
+        self._logger = AsyncLogger(self._log_directory, Server.LOG_NAME_FORMAT, **self._log_settings)
+        # База и admin создаются один раз здесь, иначе воркеры наперегонки вставят admin
+        ServerDB(self._database_directory, self._database_name)
+
+        if not hasattr(socket, "SO_REUSEPORT"):
+            # Без SO_REUSEPORT воркеры делят один унаследованный сокет
+            self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._listener.bind((self._host, self._port))
+            self._listener.listen(socket.SOMAXCONN)
+
+        self._log_queue = multiprocessing.Queue(self._log_queue_size)
+        self._processes = [self._spawn() for _ in range(self._workers)]
+        self._log(f"Supervisor started {self._workers} workers on port {self._port}")
+        try:
+            while True:
+                self._drain_logs()
+                for index, process in enumerate(self._processes):
+                    if not process.is_alive():
+                        self._log(f"Worker {process.pid} exited with code {process.exitcode}, restarting")
+                        self._processes[index] = self._spawn()
+        except KeyboardInterrupt:
+            print("Остановка воркеров...")
+        finally:
+            for process in self._processes:
+                process.terminate()
+            for process in self._processes:
+                process.join()
+            while self._drain_logs(block=False):
+                pass
+            if self._listener:
+                self._listener.close()
+            self._logger.close()
+
+    def _spawn(self):
+        process = multiprocessing.Process(target=_run_worker,
+                                          args=(self._config_file_path, self._log_queue, self._listener),
+                                          daemon=True)
+        process.start()
+        return process
+
+    # Строк за один проход: между пачками проверяется, живы ли воркеры
+    LOG_BATCH_SIZE = 1000
+
+    def _drain_logs(self, block=True):
+        """Переносит в журнал не больше LOG_BATCH_SIZE строк. Возвращает True, если строки были."""
+        lines = []
+        try:
+            lines.append(self._log_queue.get(timeout=1) if block else self._log_queue.get_nowait())
+            while len(lines) < self.LOG_BATCH_SIZE:
+                lines.append(self._log_queue.get_nowait())
+        except queue.Empty:
+            pass
+        if lines:
+            self._write_lines(lines)
+        return bool(lines)
+
+    def _log(self, content):
+        print(content)
+        self._write_lines([(os.getpid(), content)])
+
+    def _write_lines(self, lines):
+        for pid, content in lines:
+            self._logger.log(f"[{pid}] {content}")
@@ -0,0 +1,71 @@
+import argparse
+import csv
+import json
+import os
+import sys
+
+from serverDB import ServerDB
+
+# Массовый импорт и экспорт пользователей без запуска сервера:
+#   python userTool.py import users.csv [--on-conflict update] [--workers 8]
+#   python userTool.py export users.jsonl [--hashes]
+# Формат файла определяется по расширению: .csv (заголовок login,password,password_hash,role) или .jsonl
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            for row in csv.DictReader(f):
+                yield {key: value for key, value in row.items() if value}
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def write_rows(path, rows, include_hashes):
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            fields = ["id", "login", "role"] + (["password_hash"] if include_hashes else [])
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+                count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export of server users")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("file", help=".csv or .jsonl")
+    parser.add_argument("--config", default="config/config.json")
+    parser.add_argument("--on-conflict", choices=["skip", "update"], default="skip",
+                        help="what to do with logins that already exist")
+    parser.add_argument("--workers", type=int, default=None, help="processes for bcrypt hashing")
+    parser.add_argument("--hashes", action="store_true", help="export password hashes too")
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as config_file:
+        config = json.load(config_file)
+    db = ServerDB(os.path.abspath(config['database_directory']), config['database_name'])
+
+    if args.action == "import":
+        try:
+            count = db.import_users(read_rows(args.file), args.on_conflict, args.workers)
+        except (ValueError, KeyError) as e:
+            print(f"Import failed, nothing was written: {e}")
+            sys.exit(1)
+        print(f"Imported {count} users from {args.file}")
+    else:
+        count = write_rows(args.file, db.export_users(args.hashes), args.hashes)
+        print(f"Exported {count} users to {args.file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import queue
+import threading
+
+
+class WorkerPool:
+    """Фиксированное число потоков и ограниченная очередь ожидающих задач.
+    submit() не блокируется: если очередь заполнена, возвращает False,
+    и вызывающий сам решает, как отказать клиенту."""
+
+    def __init__(self, workers, max_pending):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._run, name=f"worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, func, *args):
+        try:
+            self._queue.put_nowait((func, args))
+            return True
+        except queue.Full:
+            return False
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def shutdown(self):
+        for _ in self._threads:
+            self._queue.put((None, None))
+
+    def _run(self):
+        while True:
+            func, args = self._queue.get()
+            if func is None:
+                return
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"Worker error: {e}")